@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
 from typing import List, Optional
 import json
 from ...models.models import ScriptBase, ScriptCreate, ScriptInDB, QuestionBase, Script
 from ...services.llm_service import LLMService
 from ...services.resume_parser import ResumeParser
+from ...services.parse_cache import ResumeParseCache
+from ...services.pdf_extraction import PdfExtractionPool
+from ...services.resume_store import ResumeStore
+from ...services.blob_store import BlobCodec, load_resume_text, store_text
+from ...services.script_store import flatten_questions, load_questions, save_questions, search_questions
+from ...core.config import settings
+from ...core.logging_config import log_payload
 from ...db.session import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +22,49 @@ api_router = APIRouter()
 
 # Initialize services
 llm_service = LLMService()
-resume_parser = ResumeParser()
+resume_parse_cache = (
+    ResumeParseCache(
+        max_entries=settings.RESUME_CACHE_MAX_ENTRIES,
+        cache_dir=settings.RESUME_CACHE_DIR,
+    )
+    if settings.RESUME_CACHE_ENABLED
+    else None
+)
+pdf_extraction_pool = PdfExtractionPool(
+    enabled=settings.PDF_POOL_ENABLED,
+    max_workers=settings.PDF_POOL_MAX_WORKERS,
+    timeout=settings.PDF_POOL_TIMEOUT_SECONDS,
+    max_queued=settings.PDF_POOL_MAX_QUEUED,
+)
+resume_parser = ResumeParser(
+    cache=resume_parse_cache,
+    pdf_pool=pdf_extraction_pool,
+    max_pages=settings.PDF_MAX_PAGES,
+    max_chars=settings.PDF_MAX_CHARS,
+    max_tokens=settings.PDF_MAX_TOKENS,
+)
+resume_store = ResumeStore(
+    ttl_seconds=settings.RESUME_STORE_TTL_SECONDS,
+    max_entries=settings.RESUME_STORE_MAX_ENTRIES,
+)
+blob_codec = BlobCodec(settings.BLOB_COMPRESSION, settings.BLOB_COMPRESSION_LEVEL)
+
+def _resolve_resume_text(request: dict) -> Optional[str]:
+    """
+    Return the resume text for an edit request, from "resume_handle" or "resume_text".
+    
+    Raises a 410 when the handle has expired, so the client can resend the full text.
+    """
+    handle = request.get("resume_handle")
+    if handle and not request.get("resume_text"):
+        resume_text = resume_store.get(handle)
+        if resume_text is None:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Resume handle is unknown or expired, resend resume_text"
+            )
+        return resume_text
+    return request.get("resume_text")
 
 @api_router.post("/upload-resume/", response_model=dict)
 async def upload_resume(
@@ -23,7 +72,8 @@ async def upload_resume(
 ):
     """
     Upload and parse a resume file (PDF or text).
-    Returns the extracted text content.
+    Returns the extracted text content and a resume_handle that the edit
+    endpoints accept in place of the full text.
     """
     try:
         # Read file content
@@ -32,24 +82,46 @@ async def upload_resume(
         # Parse resume content
         text = await resume_parser.parse_resume(content, file.filename)
         
-        return {"status": "success", "resume_text": text}
+        return {"status": "success", "resume_text": text, "resume_handle": resume_store.put(text)}
         
     except Exception as e:
-        logger.error(f"Error processing resume: {str(e)}")
+        logger.error("Error processing resume: %s", e)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Failed to process resume: {str(e)}"
         )
 
+@api_router.get("/cache-stats/", response_model=dict)
+async def cache_stats():
+    """
+    Return hit/miss counters for the server-side caches, LLM rate limiter state
+    and LLM token usage (output vs budget, prompt tokens served from the
+    provider's prompt cache).
+    """
+    return {
+        "status": "success",
+        "data": {
+            "resume_parse": resume_parse_cache.stats() if resume_parse_cache else None,
+            "resume_store": resume_store.stats(),
+            "llm_response": llm_service.response_cache.stats() if llm_service.response_cache else None,
+            "llm_singleflight": llm_service.singleflight.stats() if llm_service.singleflight else None,
+            "llm_rate_limits": llm_service.rate_limiter.stats() if llm_service.rate_limiter else None,
+            "llm_token_budget": llm_service.token_budget.stats(),
+        },
+    }
+
 @api_router.post("/generate-questions/", response_model=dict)
 async def generate_questions(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    bypass_cache: bool = Form(False),
+    sharded: Optional[bool] = Form(None)
 ):
     """
     Generate interview questions based on resume text.
     
     Accepts a resume file, generates interview questions, and returns them.
+    Set bypass_cache to request a fresh completion instead of a cached one,
+    and sharded to override LLM_SHARDED_GENERATION for this request.
     """
     try:
         content = await file.read()
@@ -73,31 +145,86 @@ async def generate_questions(
             num_questions=num_questions,
             breadth=INITIAL_BREADTH,
             depth=INITIAL_DEPTH,
-            persona=INITIAL_PERSONA
+            persona=INITIAL_PERSONA,
+            use_cache=not bypass_cache,
+            sharded=sharded
         )
 
         return {"status": "success", "data": result}
 
     except Exception as e:
-        logger.error(f"Error generating questions: {str(e)}")
+        logger.error("Error generating questions: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate questions: {str(e)}"
         )
 
+@api_router.post("/generate-questions/stream/")
+async def generate_questions_stream(
+    file: UploadFile = File(...),
+    bypass_cache: bool = Form(False)
+):
+    """
+    Generate interview questions and stream them as Server-Sent Events.
+    
+    Emits a "question" event for each validated question as soon as the model
+    has finished writing it, then a "done" event. Failures after the stream
+    has started are reported as an "error" event.
+    """
+    try:
+        content = await file.read()
+        resume_text = await resume_parser.parse_resume(content, file.filename)
+
+        if not resume_text or len(resume_text.strip()) < 50:
+            raise ValueError("Resume text is too short or empty. Please upload a valid resume file.")
+
+    except Exception as e:
+        logger.error("Error preparing question stream: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Failed to process resume: {str(e)}"
+        )
+
+    async def event_stream():
+        try:
+            # Same fixed parameters as /generate-questions/
+            async for event in llm_service.stream_generate_questions(
+                resume_text=resume_text,
+                num_questions=10,
+                breadth="Low",
+                depth=0,
+                persona="Why-How",
+                use_cache=not bypass_cache
+            ):
+                yield _sse_event(event["type"], event["data"])
+        except Exception as e:
+            logger.error("Error streaming questions: %s", e)
+            yield _sse_event("error", {"detail": f"Failed to generate questions: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @api_router.post("/add-question/", response_model=dict)
 async def add_question(
-    request: dict,
-    db: Session = Depends(get_db)
+    request: dict
 ):
     """
     Add a new question manually to the interview script.
     
     Accepts question data and generates follow-up questions using LLM.
+    The resume is given as "resume_handle" (from /upload-resume/) or "resume_text".
     """
+    resume_text = _resolve_resume_text(request) or ""
+    
     try:
         # Extract data from request
-        resume_text = request.get("resume_text", "")
         question_data = request.get("question", {})
         
         # Validate required fields
@@ -136,17 +263,19 @@ async def add_question(
                     question=new_question,
                     breadth=breadth,
                     depth=depth,
-                    persona=persona
+                    persona=persona,
+                    use_cache=not request.get("bypass_cache", False),
+                    prompt_variant=request.get("prompt_variant")
                 )
                 new_question = updated_question
             except Exception as e:
-                logger.warning(f"Failed to generate follow-ups for new question: {str(e)}")
+                logger.warning("Failed to generate follow-ups for new question: %s", e)
                 # Continue without follow-ups if LLM fails
         
         return {"status": "success", "data": new_question}
         
     except Exception as e:
-        logger.error(f"Error adding question: {str(e)}")
+        logger.error("Error adding question: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to add question: {str(e)}"
@@ -154,15 +283,14 @@ async def add_question(
 
 @api_router.post("/update-question/", response_model=dict)
 async def update_question(
-    request: dict,
-    db: Session = Depends(get_db)
+    request: dict
 ):
     """
     Update a question with new parameters and regenerate follow-ups.
     
     Expected request format:
     {
-        "resume_text": "...",
+        "resume_handle": "...",  # from /upload-resume/; or send "resume_text": "..."
         "question": {
             "id": 1,
             "claim": "...",
@@ -177,31 +305,29 @@ async def update_question(
         "breadth": "",  # optional - new breadth value
         "depth": "",           # optional - new depth value
         "persona": "Metrics-driven",  # optional - new persona value
-        "regenerate_followups": true  # optional flag (ignored, always regenerates)
+        "regenerate_followups": true,  # optional flag (ignored, always regenerates)
+        "bypass_cache": false,  # optional - skip the response cache for a fresh sample
+        "prompt_variant": "compact"  # optional - "compact" or "full", overrides LLM_UPDATE_PROMPT_VARIANT
     }
     """
+    resume_text = _resolve_resume_text(request)
+    
     try:
-        resume_text = request.get("resume_text")
         question = request.get("question")
         
         if not resume_text or not question:
-            raise ValueError("resume_text and question are required")
+            raise ValueError("resume_handle or resume_text, and question are required")
         
-        # Log the incoming request for debugging
-        logger.info(f"DEBUG: Update request received")
-        logger.info(f"DEBUG: Request keys: {list(request.keys())}")
-        logger.info(f"DEBUG: Raw breadth: {request.get('breadth')} (type: {type(request.get('breadth'))})")
-        logger.info(f"DEBUG: Raw depth: {request.get('depth')} (type: {type(request.get('depth'))})")
-        logger.info(f"DEBUG: Raw persona: {request.get('persona')} (type: {type(request.get('persona'))})")
-        logger.info(f"DEBUG: Question ID: {question.get('id')}, Main question: {question.get('main_question', '')[:100]}...")
-        logger.info(f"DEBUG: Question controls: {question.get('controls', {})}")
-            
         # Get update parameters (these override the question's current values)
         breadth = request.get("breadth")
         depth = request.get("depth")
         persona = request.get("persona")
         
-        logger.info(f"DEBUG: Extracted parameters - breadth: {breadth}, depth: {depth}, persona: {persona}")
+        logger.debug("Update request for question %s - breadth: %r, depth: %r, persona: %r", question.get("id"), breadth, depth, persona)
+        log_payload(
+            logger, "request", "Update request keys: %s, main question: %.100s, controls: %s",
+            list(request.keys()), question.get("main_question", ""), question.get("controls", {})
+        )
         
         # Update question using LLM
         updated_question = await llm_service.update_question(
@@ -209,71 +335,189 @@ async def update_question(
             question=question,
             breadth=breadth,
             depth=depth,
-            persona=persona
+            persona=persona,
+            use_cache=not request.get("bypass_cache", False),
+            prompt_variant=request.get("prompt_variant")
         )
         
-        logger.info(f"Successfully updated question {question.get('id')} with breadth: {updated_question.get('controls', {}).get('breadth')}")
+        logger.info("Successfully updated question %s with breadth: %s", question.get("id"), updated_question.get("controls", {}).get("breadth"))
         
         return {"status": "success", "data": updated_question}
         
     except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error in update_question endpoint: {str(e)}")
-        logger.error(f"Request data: {request}")
+        logger.error("JSON decode error in update_question endpoint: %s", e)
+        logger.error("Request data: %s", request)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Invalid JSON in request or response: {str(e)}"
         )
     except ValueError as e:
-        logger.error(f"Value error in update_question endpoint: {str(e)}")
+        logger.error("Value error in update_question endpoint: %s", e)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Invalid request data: {str(e)}"
         )
     except Exception as e:
-        logger.error(f"Error updating question: {str(e)}")
-        logger.error(f"Request data: {request}")
+        logger.error("Error updating question: %s", e)
+        logger.error("Request data: %s", request)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Failed to update question: {str(e)}"
         )
 
+@api_router.post("/update-questions/")
+async def update_questions(request: dict):
+    """
+    Regenerate follow-ups for several questions with the same new controls.
+    
+    The LLM calls run concurrently (bounded by LLM_BATCH_CONCURRENCY), so a
+    whole script costs roughly one round-trip of wall time.
+    
+    Expected request format:
+    {
+        "resume_handle": "...",       # or "resume_text": "..."
+        "questions": [{...}, {...}],  # question objects as sent to /update-question/
+        "question_ids": [1, 3],       # optional - only regenerate these questions
+        "breadth": "Medium",          # optional - new breadth value
+        "depth": 2,                   # optional - new depth value
+        "persona": "Metrics-driven",  # optional - new persona value
+        "stream": false,              # optional - stream results as Server-Sent Events
+        "bypass_cache": false,        # optional - skip the response cache
+        "prompt_variant": "compact"   # optional - "compact" or "full"
+    }
+    
+    Returns per-question results in request order, or with "stream" a
+    "result" event as each question finishes followed by a "done" event.
+    Each result carries "index", its position among the questions being
+    regenerated (after the question_ids filter).
+    """
+    resume_text = _resolve_resume_text(request)
+    questions = request.get("questions")
+
+    if not resume_text or not isinstance(questions, list) or not questions:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid request data: resume_handle or resume_text, and a non-empty questions list are required"
+        )
+
+    if not all(isinstance(q, dict) for q in questions):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid request data: every item in questions must be a question object"
+        )
+
+    question_ids = request.get("question_ids")
+    if question_ids is not None:
+        if not isinstance(question_ids, list) or not all(isinstance(i, (int, str)) for i in question_ids):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid request data: question_ids must be a list of question ids"
+            )
+        wanted = set(question_ids)
+        questions = [q for q in questions if q.get("id") in wanted]
+        if not questions:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid request data: no questions match question_ids"
+            )
+
+    results = llm_service.update_questions(
+        resume_text=resume_text,
+        questions=questions,
+        breadth=request.get("breadth"),
+        depth=request.get("depth"),
+        persona=request.get("persona"),
+        use_cache=not request.get("bypass_cache", False),
+        prompt_variant=request.get("prompt_variant")
+    )
+
+    if request.get("stream"):
+        async def event_stream():
+            failed = 0
+            async for result in results:
+                failed += result["status"] != "success"
+                yield _sse_event("result", result)
+            yield _sse_event("done", {"count": len(questions), "failed": failed})
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    collected = [result async for result in results]
+    collected.sort(key=lambda result: result["index"])
+    logger.info("Batch updated %d questions", len(collected))
+
+    return {"status": "success", "data": collected}
+
+def _script_response(script: Script, resume_text: Optional[str], questions_json: str) -> dict:
+    return {
+        "id": script.id,
+        "recruiter_id": script.recruiter_id,
+        "resume_text": resume_text,
+        "questions_json": questions_json,
+        "created_at": script.created_at,
+        "updated_at": script.updated_at,
+    }
+
 @api_router.post("/save-script/", response_model=ScriptInDB)
 async def save_script(
     script_data: ScriptCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Save an interview script to the database.
+    
+    Questions are stored one row per question, follow-up and nested question;
+    scripts whose questions do not have that shape are kept as JSON. The
+    resume goes to the blobs table, compressed and stored once per distinct text.
     """
     try:
         # questions_json should already be a JSON string from the frontend
-        # Just validate it's valid JSON
         if isinstance(script_data.questions_json, str):
             try:
-                json.loads(script_data.questions_json)  # Validate it's valid JSON
+                questions = json.loads(script_data.questions_json)
                 questions_json = script_data.questions_json
             except json.JSONDecodeError:
                 raise ValueError("questions_json must be valid JSON string")
         else:
             # If it's not a string, convert it to JSON string
+            questions = script_data.questions_json
             questions_json = json.dumps(script_data.questions_json)
         
+        try:
+            rows = flatten_questions(questions)
+        except ValueError as e:
+            logger.info("Storing script questions as JSON: %s", e)
+            rows = None
+        
+        # The resume is stored once per distinct text, compressed
+        resume_blob_hash = None
+        if script_data.resume_text is not None:
+            resume_blob_hash = await store_text(db, blob_codec, script_data.resume_text)
+        
         # Create new script record
         db_script = Script(
             recruiter_id=script_data.recruiter_id,
-            resume_text=script_data.resume_text,
-            questions_json=questions_json
+            resume_blob_hash=resume_blob_hash,
+            questions_json=None if rows is not None else questions_json
         )
         
         db.add(db_script)
-        db.commit()
-        db.refresh(db_script)
+        # The question rows need the script's id
+        await db.flush()
+        if rows is not None:
+            await save_questions(db, db_script.id, rows)
+        # Read created_at back before committing, so a save is a single transaction
+        await db.refresh(db_script)
+        await db.commit()
         
-        return db_script
+        return _script_response(db_script, script_data.resume_text, questions_json)
         
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error saving script: {str(e)}")
+        await db.rollback()
+        logger.error("Error saving script: %s", e)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"Failed to save script: {str(e)}"
@@ -282,23 +526,38 @@ async def save_script(
 @api_router.get("/get-script/{script_id}", response_model=ScriptInDB)
 async def get_script(
     script_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve a saved script by ID.
     """
-    script = db.query(Script).filter(Script.id == script_id).first()
+    script = await db.get(Script, script_id)
     if not script:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Script with ID {script_id} not found"
         )
     
-    # Parse questions JSON if it's a string
-    if isinstance(script.questions_json, str):
-        try:
-            script.questions_json = json.loads(script.questions_json)
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse questions_json for script ID {script_id}")
+    try:
+        questions_json = json.dumps(await load_questions(db, script))
+    except ValueError as e:
+        # Return the stored text unchanged rather than failing the request
+        logger.error("Failed to parse questions_json for script ID %s: %s", script_id, e)
+        questions_json = script.questions_json
     
-    return script
\ No newline at end of file
+    return _script_response(script, await load_resume_text(db, script), questions_json)
+
+@api_router.get("/script-questions/", response_model=dict)
+async def search_script_questions(
+    persona: Optional[str] = None,
+    depth: Optional[int] = None,
+    breadth: Optional[str] = None,
+    claim: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Find saved questions by persona, depth, breadth and/or text in the claim.
+    """
+    results = await search_questions(db, persona=persona, depth=depth, breadth=breadth, claim=claim, limit=limit)
+    return {"status": "success", "data": results}
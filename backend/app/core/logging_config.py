@@ -0,0 +1,133 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+from typing import Any, Dict, Optional
+
+from .tracing import RequestIdFilter
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# Argument types that cannot change after the call, so formatting them later is safe
+_IMMUTABLE = (str, bytes, int, float, bool, type(None))
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a ``QueueListener`` thread instead of writing them inline.
+
+    Messages are formatted on the listener thread when every argument is
+    immutable; otherwise the caller formats them, so a dict that is changed
+    after the log call is still logged as it was. When the queue is full,
+    records are dropped and counted rather than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class PayloadSampler:
+    """Decides which payload dumps (request bodies, LLM output previews) get logged.
+
+    Each category has a rate between 0 and 1; categories without their own
+    rate use ``default_rate``.
+    """
+
+    def __init__(self, default_rate: float = 0.0, rates: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_rates(spec: str) -> Dict[str, float]:
+        """Parse "category:rate,category:rate" into a dict."""
+        rates = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            category, _, rate = item.partition(":")
+            try:
+                rates[category.strip()] = float(rate)
+            except ValueError:
+                raise ValueError(f"Invalid payload sample rate: {item}")
+        return rates
+
+    def sample(self, category: str) -> bool:
+        rate = self.rates.get(category, self.default_rate)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+payload_sampler = PayloadSampler()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def log_payload(logger: logging.Logger, category: str, msg: str, *args: Any) -> None:
+    """Log a payload dump: always at DEBUG level, otherwise a sample of them at INFO.
+
+    Arguments are only formatted when the record is actually emitted, so
+    skipped dumps cost one sampling decision.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args)
+    elif logger.isEnabledFor(logging.INFO) and payload_sampler.sample(category):
+        logger.info(msg, *args)
+
+def configure_logging(
+    level: str = "INFO",
+    non_blocking: bool = True,
+    queue_size: int = 10000,
+    payload_sample_rate: float = 0.0,
+    payload_sample_rates: str = "",
+) -> None:
+    """Set up root logging for the application.
+
+    With ``non_blocking``, log calls only enqueue the record; a listener
+    thread formats and writes it to stderr.
+    """
+    global _listener
+    stop_logging()
+
+    payload_sampler.default_rate = payload_sample_rate
+    payload_sampler.rates = PayloadSampler.parse_rates(payload_sample_rates)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level.upper())
+
+    if non_blocking:
+        handler: logging.Handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = stream_handler
+    # The request id lives in a context variable, so it is read here, before the record changes threads
+    handler.addFilter(RequestIdFilter())
+    root.addHandler(handler)
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,291 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from .metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Client-supplied request ids are kept only if they look like an id, not arbitrary text
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+class Span:
+    """One timed stage of a request.
+
+    Spans nest through a context variable, so a span opened inside another
+    (also across ``await`` and in tasks created while it is open) becomes
+    its child. Finished spans collect on the trace's root span.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "error", "start", "duration", "_start_perf", "_spans")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self._start_perf = time.perf_counter()
+        # Shared by every span in the trace
+        self._spans: List["Span"] = parent._spans if parent else []
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start_perf
+        self._spans.append(self)
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - trace_start) * 1000, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class TraceExporter:
+    """Writes finished traces off the event loop.
+
+    Each trace goes as one JSON line to ``path`` and/or as Zipkin v2 spans to
+    ``collector_url`` (Zipkin, Jaeger and the OpenTelemetry collector accept
+    this format). Traces are handed to a background thread through a bounded
+    queue; when it is full, traces are dropped rather than slowing requests.
+    """
+
+    def __init__(self, path: Optional[str] = None, collector_url: Optional[str] = None, max_queued: int = 1000, timeout: float = 2.0):
+        self.path = path
+        self.collector_url = collector_url
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queued)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.collector_url)
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """Flush queued traces and stop the worker thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=self.timeout + 1)
+        self._thread = None
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                if self.path:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(trace, default=str) + "\n")
+                if self.collector_url:
+                    self._post(zipkin_spans(trace))
+            except Exception as e:
+                logger.warning("Could not export trace %s: %s", trace.get("trace_id"), e)
+
+    def _post(self, spans: List[Dict[str, Any]]) -> None:
+        request = urllib.request.Request(
+            self.collector_url,
+            data=json.dumps(spans, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+def zipkin_spans(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert an exported trace to the Zipkin v2 JSON span list."""
+    spans = []
+    start_us = int(trace["start"] * 1_000_000)
+    for span in trace["spans"]:
+        tags = {key: str(value) for key, value in span["attributes"].items()}
+        if span["error"]:
+            tags["error"] = span["error"]
+        entry = {
+            "traceId": trace["trace_id"],
+            "id": span["span_id"],
+            "name": span["name"],
+            "timestamp": start_us + int(span["offset_ms"] * 1000),
+            "duration": max(1, int(span["duration_ms"] * 1000)),
+            "localEndpoint": {"serviceName": trace["service"]},
+            "tags": tags,
+        }
+        if span["parent_id"]:
+            entry["parentId"] = span["parent_id"]
+        spans.append(entry)
+    return spans
+
+class Tracer:
+    """Starts request traces and exports those at or over ``slow_threshold_ms``."""
+
+    def __init__(self, service: str, exporter: TraceExporter, enabled: bool = True, slow_threshold_ms: float = 0.0):
+        self.service = service
+        self.exporter = exporter
+        self.enabled = enabled
+        self.slow_threshold_ms = slow_threshold_ms
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Open the root span of a trace; stages inside it are recorded with ``span``."""
+        if not self.enabled:
+            yield None
+            return
+        root = Span(name, uuid.uuid4().hex, attributes=attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            root.finish()
+            if root.duration * 1000 >= self.slow_threshold_ms:
+                self.exporter.export(self._serialize(root))
+
+    def _serialize(self, root: Span) -> Dict[str, Any]:
+        return {
+            "trace_id": root.trace_id,
+            "service": self.service,
+            "name": root.name,
+            "request_id": root.attributes.get("request_id"),
+            "start": root.start,
+            "duration_ms": round(root.duration * 1000, 3),
+            "spans": [span.to_dict(root.start) for span in sorted(root._spans, key=lambda s: s.start)],
+        }
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a stage as a child of the current span.
+
+    Outside a trace (scripts, benchmarks, tracing disabled) this does nothing
+    and yields None.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent=parent, attributes=attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator that runs a function, sync or async, inside ``span(name)``."""
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_attributes(**attributes: Any) -> None:
+    """Attach attributes to the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+class RequestIdFilter(logging.Filter):
+    """Adds ``request_id`` to log records so formats can include ``%(request_id)s``."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or "-"
+        return True
+
+class TracingMiddleware:
+    """ASGI middleware that assigns a request id and traces the request.
+
+    The id comes from the ``X-Request-ID`` header when the client sends a
+    usable one, otherwise a new one is generated; it is echoed on the
+    response and attached to every log record written while the request is
+    handled. The root span is named after the route template.
+    """
+
+    def __init__(self, app: Any, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode("latin-1")
+        supplied = next((value.decode("latin-1") for key, value in scope.get("headers", []) if key == header), "")
+        request_id = supplied if _VALID_REQUEST_ID.match(supplied) else uuid.uuid4().hex
+        token = _request_id.set(request_id)
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(header, request_id.encode("latin-1"))]
+                if root is not None:
+                    root.set(status=message["status"])
+            await send(message)
+
+        try:
+            with self.tracer.start_trace(scope.get("method", ""), request_id=request_id, path=scope.get("path", "")) as root:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if root is not None:
+                        root.name = f"{scope.get('method', '')} {route_template(scope) or 'unmatched'}"
+        finally:
+            _request_id.reset(token)
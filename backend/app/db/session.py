@@ -1,21 +1,140 @@
-from sqlalchemy import create_engine
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from ..core.config import settings
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+# Async driver for each backend; the sync engine uses the backend's default driver
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _backend(url: str) -> str:
+    backend = make_url(url).get_backend_name()
+    return "postgresql" if backend == "postgres" else backend
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a database URL, e.g. sqlite:// -> sqlite+aiosqlite://"""
+    parsed = make_url(url)
+    backend = _backend(url)
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def sync_database_url(url: str) -> str:
+    """The default-driver form of a database URL, so an async URL also works for scripts"""
+    return make_url(url).set(drivername=_backend(url)).render_as_string(hide_password=False)
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+def sqlite_pragmas(journal_mode: str, synchronous: str, busy_timeout_ms: int) -> List[str]:
+    """PRAGMA statements run on every new SQLite connection"""
+    journal_mode, synchronous = journal_mode.upper(), synchronous.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLite journal mode: {journal_mode}")
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unsupported SQLite synchronous level: {synchronous}")
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        # SQLite ignores foreign keys, including ON DELETE CASCADE, unless asked per connection
+        "PRAGMA foreign_keys=ON",
+    ]
+
+def _sqlite_in_memory(url: str) -> bool:
+    """Whether a SQLite URL names an in-memory database rather than a file"""
+    parsed = make_url(url)
+    return parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    if _backend(url) == "sqlite":
+        if _sqlite_in_memory(url):
+            # An in-memory database lives only as long as its connection, so
+            # every checkout shares one; StaticPool takes no queue-pool options
+            return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+        # File-backed SQLite connections are handed between threads by the pool. Every
+        # transaction takes the single write lock (see _apply_sqlite_profile),
+        # so one connection per process is enough: requests queue for it in
+        # order, and only other processes contend in SQLite's busy handler.
+        return {
+            "connect_args": {"check_same_thread": False},
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        }
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _apply_sqlite_profile(engine: Engine) -> None:
+    """Set journal mode, sync level and busy timeout on each connection the engine opens,
+    and start every transaction with BEGIN IMMEDIATE.
+
+    With pysqlite's deferred transactions a session reads first and upgrades
+    to a write lock later; when another connection is writing, that upgrade
+    fails with "database is locked" straight away instead of waiting out the
+    busy timeout. Taking the write lock up front makes writers queue on the
+    busy timeout instead. In WAL mode readers are not blocked by it.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(
+        settings.DB_SQLITE_JOURNAL_MODE, settings.DB_SQLITE_SYNCHRONOUS, settings.DB_SQLITE_BUSY_TIMEOUT_MS
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        # Stop pysqlite from opening transactions itself; begin_immediate does it
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(conn: Connection) -> None:
+        if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+SQLALCHEMY_DATABASE_URL = sync_database_url(settings.DATABASE_URL)
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+# Sync engine for scripts, migrations and table creation
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+_apply_sqlite_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries and commits do not block the event loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **_engine_options(ASYNC_SQLALCHEMY_DATABASE_URL))
+_apply_sqlite_profile(async_engine.sync_engine)
+# Objects stay readable after commit, since responses are serialized once the session is done
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    """Dependency for getting database session"""
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_sync_db() -> Iterator[Session]:
+    """Sync session generator for scripts and other code outside the event loop"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def dispose_engines() -> None:
+    """Close pooled connections; called from the application's shutdown hook"""
+    await async_engine.dispose()
+    engine.dispose()
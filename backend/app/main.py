@@ -1,16 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .api.api_v1.api import api_router
+from .core.logging_config import configure_logging, stop_logging
+from .core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from .core.tracing import REQUEST_ID_HEADER, TraceExporter, Tracer, TracingMiddleware
+from .api.api_v1.api import api_router, resume_parser, llm_service
+from .db.session import dispose_engines
 import logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+configure_logging(
+    level=settings.LOG_LEVEL,
+    non_blocking=settings.LOG_NON_BLOCKING,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    payload_sample_rate=settings.LOG_PAYLOAD_SAMPLE_RATE,
+    payload_sample_rates=settings.LOG_PAYLOAD_SAMPLE_RATES,
 )
 logger = logging.getLogger(__name__)
 
+tracer = Tracer(
+    settings.PROJECT_NAME,
+    TraceExporter(path=settings.TRACE_EXPORT_PATH, collector_url=settings.TRACE_COLLECTOR_URL),
+    enabled=settings.TRACING_ENABLED,
+    slow_threshold_ms=settings.TRACE_SLOW_THRESHOLD_MS,
+)
+
 app = FastAPI(
     title="Interview Script Designer API",
     description="API for generating and managing technical interview scripts",
@@ -24,8 +38,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -33,12 +52,23 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def root():
     return {"message": "Welcome to the Interview Script Designer API"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Request, LLM, parser and PDF metrics in the Prometheus text format"""
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up Interview Script Designer API")
+    await llm_service.startup()
     # Initialize database connection here if needed
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down Interview Script Designer API")
-    # Close database connection here if needed
+    resume_parser.shutdown()
+    await llm_service.aclose()
+    await dispose_engines()
+    tracer.exporter.shutdown()
+    stop_logging()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, ForeignKeyConstraint, Index, LargeBinary
 from sqlalchemy.sql import func
 from typing import List, Optional
 from datetime import datetime
@@ -6,16 +6,85 @@ from pydantic import BaseModel, Field
 from ..db.session import Base
 
 # SQLAlchemy Models
+class Blob(Base):
+    """Compressed text stored once per distinct content, keyed by its SHA-256."""
+    __tablename__ = "blobs"
+    
+    hash = Column(String(64), primary_key=True)  # hex SHA-256 of the uncompressed UTF-8 text
+    codec = Column(String(10), nullable=False)  # zlib, zstd or none
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Script(Base):
     __tablename__ = "scripts"
     
     id = Column(Integer, primary_key=True, index=True)
     recruiter_id = Column(String(50), index=True, nullable=False)
+    # Only set on rows saved before blob storage, until scripts/migrate_blob_storage.py has run
     resume_text = Column(Text, nullable=True)
-    questions_json = Column(Text, nullable=False)
+    resume_blob_hash = Column(String(64), ForeignKey("blobs.hash"), index=True, nullable=True)
+    # Only set for scripts whose questions do not fit the tables below (and for rows
+    # saved before them, until scripts/migrate_normalize_questions.py has run)
+    questions_json = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class ScriptQuestion(Base):
+    """One question of a saved script, in script order."""
+    __tablename__ = "script_questions"
+    
+    script_id = Column(Integer, ForeignKey("scripts.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    question_id = Column(Integer, nullable=True)  # the question's "id" within the script
+    claim = Column(Text, nullable=True)
+    main_question = Column(Text, nullable=True)
+    breadth = Column(String(20), nullable=True)
+    depth = Column(Integer, nullable=True)
+    persona = Column(String(50), nullable=True)
+    extra_json = Column(Text, nullable=True)  # any other keys the client sent with the question
+    
+    __table_args__ = (
+        Index("ix_script_questions_persona_depth", "persona", "depth"),
+        Index("ix_script_questions_depth", "depth"),
+    )
+
+class ScriptFollowUp(Base):
+    """A follow-up of a script question."""
+    __tablename__ = "script_follow_ups"
+    
+    script_id = Column(Integer, primary_key=True)
+    question_position = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    question = Column(Text, nullable=True)
+    extra_json = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["script_id", "question_position"],
+            ["script_questions.script_id", "script_questions.position"],
+            ondelete="CASCADE",
+        ),
+    )
+
+class ScriptNestedQuestion(Base):
+    """A nested question under a follow-up."""
+    __tablename__ = "script_nested_questions"
+    
+    script_id = Column(Integer, primary_key=True)
+    question_position = Column(Integer, primary_key=True)
+    follow_up_position = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["script_id", "question_position", "follow_up_position"],
+            ["script_follow_ups.script_id", "script_follow_ups.question_position", "script_follow_ups.position"],
+            ondelete="CASCADE",
+        ),
+    )
+
 # Pydantic Models (Schemas)
 class QuestionBase(BaseModel):
     id: int
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import zlib
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import Blob, Script
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("zlib", "zstd", "none")
+
+class BlobCodec:
+    """Turns text into rows for the blobs table and back.
+
+    Rows are keyed by the SHA-256 of the text, so the same text is stored
+    once however many scripts refer to it. Text that does not get smaller
+    when compressed is stored as is, with codec "none". The codec is kept
+    per row, so changing BLOB_COMPRESSION only affects new blobs.
+    """
+
+    def __init__(self, codec: str = "zlib", level: Optional[int] = None):
+        codec = codec.lower()
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported blob compression: {codec}")
+        if codec == "zstd" and zstandard is None:
+            logger.warning("BLOB_COMPRESSION is zstd but the zstandard package is not installed, using zlib")
+            codec = "zlib"
+        self.codec = codec
+        self.level = level
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == "zlib":
+            return zlib.compress(raw, -1 if self.level is None else self.level)
+        if self.codec == "zstd":
+            compressor = zstandard.ZstdCompressor() if self.level is None else zstandard.ZstdCompressor(level=self.level)
+            return compressor.compress(raw)
+        return raw
+
+    def encode(self, text: str) -> Dict[str, Any]:
+        """The blobs row for a text."""
+        raw = text.encode("utf-8")
+        codec, data = self.codec, self._compress(raw)
+        if len(data) >= len(raw):
+            codec, data = "none", raw
+        return {"hash": hashlib.sha256(raw).hexdigest(), "codec": codec, "size": len(raw), "data": data}
+
+    @staticmethod
+    def decode(codec: str, data: bytes) -> str:
+        """The text stored in a blobs row."""
+        if codec == "zlib":
+            raw = zlib.decompress(data)
+        elif codec == "zstd":
+            if zstandard is None:
+                raise ValueError("Blob is zstd-compressed but the zstandard package is not installed")
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        elif codec == "none":
+            raw = bytes(data)
+        else:
+            raise ValueError(f"Unknown blob codec: {codec}")
+        return raw.decode("utf-8")
+
+def blob_insert(dialect_name: str, row: Dict[str, Any]) -> Any:
+    """INSERT for a blobs row that does nothing when the hash is already stored."""
+    if dialect_name == "postgresql":
+        return postgresql.insert(Blob).values(**row).on_conflict_do_nothing(index_elements=["hash"])
+    if dialect_name == "sqlite":
+        return sqlite.insert(Blob).values(**row).on_conflict_do_nothing(index_elements=["hash"])
+    return insert(Blob).values(**row)
+
+async def store_text(db: AsyncSession, codec: BlobCodec, text: str) -> str:
+    """Store text as a blob unless it already is one; returns its hash. The caller commits."""
+    row = codec.encode(text)
+    await db.execute(blob_insert(db.bind.dialect.name, row))
+    return row["hash"]
+
+async def load_text(db: AsyncSession, blob_hash: str) -> Optional[str]:
+    blob = await db.get(Blob, blob_hash)
+    return BlobCodec.decode(blob.codec, blob.data) if blob else None
+
+async def load_resume_text(db: AsyncSession, script: Script) -> Optional[str]:
+    """A script's resume text, from its blob or, for rows saved before blob storage, the resume_text column."""
+    if script.resume_blob_hash is None:
+        return script.resume_text
+    return await load_text(db, script.resume_blob_hash)
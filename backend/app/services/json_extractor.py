@@ -0,0 +1,218 @@
+import json
+import re
+from typing import Any, List, Optional
+
+_decoder = json.JSONDecoder()
+# Outside strings only brackets and strings matter; a complete string is consumed in one
+# match, a lone quote starts a string that continues in the next chunk
+_STRUCTURE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|["{}\[\]]')
+# Inside an unfinished string, only quotes and backslashes matter
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CONTROL_CHARS = re.compile(r"[\x00-\x1f]")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_COMMENT = r"//[^\n]*|/\*[\s\S]*?\*/|#[^\n]*"
+# Only whitespace and comments between here and a closing bracket
+_CLOSER_AHEAD = rf"(?:\s|{_COMMENT})*[}}\]]"
+# Text that needs no repair is matched in long runs so the callback runs rarely:
+# well-formed strings, whitespace, numbers, brackets, commas that are not
+# trailing and JSON literals. What is left is one of the repairable tokens.
+_REPAIR = re.compile(
+    r"(?P<valid>(?:"
+    r'"[^"\\\x00-\x1f]*(?:\\.[^"\\\x00-\x1f]*)*"'
+    r"""|[^"'/#,A-Za-z_]+"""
+    rf"|,(?!{_CLOSER_AHEAD})"
+    r"|(?:true|false|null)\b(?!\s*:)"
+    r")+)"
+    r'|(?P<double>"[^"\\]*(?:\\.[^"\\]*)*")'
+    r"|(?P<single>'[^'\\]*(?:\\.[^'\\]*)*')"
+    rf"|(?P<comment>{_COMMENT})"
+    rf"|(?P<comma>,(?={_CLOSER_AHEAD}))"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)(?P<colon>\s*:)?"
+)
+
+class JsonScanner:
+    """Incremental, string-aware scan for the first JSON object in model output.
+
+    Text can be fed in chunks as it streams in. Text before the first ``{``
+    (markdown fences, prose) is skipped, and braces and brackets inside
+    double-quoted strings are not counted, so ``end`` is the real end of the
+    object. The scan jumps between quotes and brackets with a regex instead
+    of visiting every character. When ``item_key`` is given, the text of each
+    element of the top-level array stored under that key is collected in
+    ``items`` as soon as it closes.
+    """
+
+    def __init__(self, item_key: Optional[str] = None):
+        self.item_key = item_key
+        self.items: List[str] = []
+        self.text = ""
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the object has been closed."""
+        return self.end is not None
+
+    def feed(self, chunk: str) -> List[str]:
+        """Scan another chunk and return the texts of array items completed by it."""
+        self.text += chunk
+        if self.done:
+            return []
+        text = self.text
+        end = len(text)
+        pos = self._pos
+        if self.start is None:
+            start = text.find("{", pos)
+            if start == -1:
+                self._pos = end
+                return []
+            self.start = start
+            self._depth = 1
+            pos = start + 1
+
+        depth = self._depth
+        in_string = self._in_string
+        items = []
+        while pos < end:
+            if in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    pos = end
+                    break
+                if match.group() == "\\":
+                    if match.end() >= end:
+                        pos = match.start()  # wait for the escaped character
+                        break
+                    pos = match.end() + 1
+                    continue
+                in_string = False
+                pos = match.end()
+                if depth == 1:
+                    self._last_key = text[self._string_start + 1:match.start()]
+                continue
+
+            for match in _STRUCTURE.finditer(text, pos):
+                token, index, pos = match.group(), match.start(), match.end()
+                char = token[0]
+                if char == '"':
+                    if len(token) == 1:
+                        # The string does not end in the text so far
+                        in_string = True
+                        self._string_start = index
+                        break
+                    if depth == 1:
+                        self._last_key = token[1:-1]
+                elif char == "{" or char == "[":
+                    if char == "[" and depth == 1 and self.item_key is not None and self._last_key == self.item_key:
+                        self._array_depth = depth + 1
+                    elif char == "{" and self._array_depth is not None and depth == self._array_depth:
+                        self._item_start = index
+                    depth += 1
+                else:
+                    depth -= 1
+                    if self._array_depth is not None and depth == self._array_depth and self._item_start is not None:
+                        items.append(text[self._item_start:pos])
+                        self._item_start = None
+                    elif self._array_depth is not None and depth < self._array_depth:
+                        self._array_depth = None
+                    if depth == 0:
+                        self.end = pos
+                        break
+            else:
+                pos = end
+            if self.end is not None:
+                break
+
+        self._pos = pos
+        self._depth = depth
+        self._in_string = in_string
+        self.items.extend(items)
+        return items
+
+def parse_json(text: str) -> Any:
+    """Parse the first JSON object in ``text``, repairing it if necessary.
+
+    Well-formed output is decoded directly by the C decoder starting at the
+    first ``{``. When that fails, the text from the first ``{`` on is
+    repaired by ``fix_json_issues`` and decoded again; the decoder stops at
+    the end of the object, so trailing prose or fences need no scan.
+
+    Raises:
+        ValueError: If no JSON object was found
+        json.JSONDecodeError: If the object could not be repaired
+    """
+    if not text:
+        raise ValueError("Empty response")
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        return _decoder.raw_decode(fix_json_issues(text[start:]))[0]
+
+def clean_response(response: str) -> str:
+    """Clean the response text to extract valid JSON"""
+    if not response:
+        raise ValueError("Empty response")
+
+    text = response.strip()
+
+    # Remove markdown code blocks
+    if "```json" in text:
+        parts = text.split("```json", 1)
+        if len(parts) > 1:
+            text = parts[1].split("```", 1)[0].strip()
+    elif "```" in text:
+        parts = text.split("```", 1)
+        if len(parts) > 1:
+            text = parts[1].split("```", 1)[0].strip()
+
+    # Find the object's boundaries, ignoring braces inside strings
+    scanner = JsonScanner()
+    scanner.feed(text)
+    if scanner.start is None:
+        raise ValueError("No JSON object found in response")
+    start_pos, end_pos = scanner.start, scanner.end or len(text)
+
+    return fix_json_issues(text[start_pos:end_pos])
+
+def fix_json_issues(json_text: str) -> str:
+    """Fix common JSON formatting issues in one string-aware regex pass.
+
+    Trailing commas, ``//``, ``/* */`` and ``#`` comments are dropped,
+    single-quoted strings and unquoted keys get double quotes, Python
+    literals become JSON ones and raw control characters inside strings are
+    escaped. String contents are never touched otherwise.
+    """
+    return _REPAIR.sub(_repair_token, json_text).strip()
+
+def _escape_control(match: "re.Match[str]") -> str:
+    char = match.group()
+    return _CONTROL_ESCAPES.get(char) or f"\\u{ord(char):04x}"
+
+def _repair_token(match: "re.Match[str]") -> str:
+    kind = match.lastgroup
+    if kind == "valid":
+        return match.group()
+    if kind == "double":
+        return _CONTROL_CHARS.sub(_escape_control, match.group())
+    if kind == "single":
+        body = match.group()[1:-1].replace("\\'", "'").replace('"', '\\"')
+        return '"' + _CONTROL_CHARS.sub(_escape_control, body) + '"'
+    if kind == "comment" or kind == "comma":
+        return ""
+    word = match.group("word")
+    if kind == "colon":
+        # Unquoted key
+        return f'"{word}"{match.group("colon")}'
+    return _LITERALS.get(word, word)
@@ -0,0 +1,47 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from .json_extractor import JsonScanner
+
+logger = logging.getLogger(__name__)
+
+class QuestionStreamParser:
+    """Incrementally extracts complete objects from a JSON array in streamed text.
+
+    Feed it chunks of a model response shaped like ``{"questions": [{...}, ...]}``
+    and it returns each element of the array as soon as its closing brace
+    arrives. Scanning is done by ``JsonScanner``, the same string-aware
+    scanner that ``parse_json`` uses to find the object in a full response,
+    so text around the JSON (markdown fences, prose) is ignored and braces
+    inside strings are not counted.
+    """
+
+    def __init__(self, array_key: str = "questions"):
+        self._scanner = JsonScanner(item_key=array_key)
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._scanner.text
+
+    @property
+    def done(self) -> bool:
+        """Whether the top-level JSON object has been closed."""
+        return self._scanner.done
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return any array elements completed by it."""
+        items = []
+        for item_text in self._scanner.feed(chunk):
+            item = self._decode(item_text)
+            if item is not None:
+                items.append(item)
+        return items
+
+    def _decode(self, item_text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(item_text)
+        except json.JSONDecodeError as e:
+            logger.warning("Skipping malformed streamed item: %s", e)
+            return None
+        return item if isinstance(item, dict) else None
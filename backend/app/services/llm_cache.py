@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """Two-tier cache for raw chat completion responses.
+
+    Keys are a hash of provider, model, temperature and messages. Lookups hit
+    an in-process LRU first and then an optional SQLite table, so identical
+    prompts are answered without a provider round-trip across restarts. Both
+    tiers honour the same TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 24 * 60 * 60,
+        db_path: Optional[str] = None
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, max_tokens: Optional[int], messages: List[Dict[str, Any]]) -> str:
+        """Hash everything that determines a completion into a cache key.
+
+        max_tokens is part of the key because a response cut off by a small
+        output budget must not be served to a call with a larger one.
+        """
+        payload = json.dumps(
+            {"provider": provider, "model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": messages},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+
+        entry = await asyncio.to_thread(self._db_get, key, now) if self._db else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._store(key, *entry)
+        return entry[0]
+
+    async def set(self, key: str, response: str) -> None:
+        """Store a response in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, response, expires_at)
+        if self._db:
+            await asyncio.to_thread(self._db_set, key, response, expires_at)
+
+    async def invalidate(self, key: str) -> None:
+        """Remove a response, e.g. one that turned out to be unparseable."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._db:
+            await asyncio.to_thread(self._db_delete, key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        if self._db:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def _store(self, key: str, response: str, expires_at: float) -> None:
+        """Insert into the LRU, evicting the oldest entries. Caller holds the lock."""
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _db_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] <= now:
+                    self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+                return row
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read failed: %s", e)
+            return None
+
+    def _db_set(self, key: str, response: str, expires_at: float) -> None:
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def _db_delete(self, key: str) -> None:
+        try:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache delete failed: %s", e)
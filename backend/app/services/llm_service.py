@@ -1,9 +1,22 @@
+import asyncio
 import json
 import logging
 import re
+import time
 import httpx
-from typing import Dict, List, Optional, Any
+from contextlib import aclosing, nullcontext
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Any, Tuple, Union
 from ..core.config import settings
+from ..core.logging_config import log_payload
+from ..core.metrics import llm_padded_questions, llm_parse_fallbacks, llm_request_seconds, llm_tokens
+from ..core.tracing import set_attributes, span, traced
+from .llm_cache import LLMResponseCache
+from .mock_provider import MockAsyncOpenAI
+from .json_extractor import parse_json
+from .json_stream import QuestionStreamParser
+from .rate_limiter import ProviderRateLimiter, estimate_tokens
+from .singleflight import SingleFlight
+from .token_budget import TokenBudget
 from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
@@ -11,160 +24,587 @@ logger = logging.getLogger(__name__)
 class LLMService:
     def __init__(self):
         self.provider = settings.LLM_PROVIDER.lower()
-        self.client: Optional[AsyncOpenAI] = None
+        self.client: Optional[Union[AsyncOpenAI, MockAsyncOpenAI]] = None
         self.model: str = settings.OPENAI_MODEL
-        self._setup_provider()
+        self.temperature: float = 0.7
+        self.response_cache: Optional[LLMResponseCache] = None
+        self._batch_semaphore: Optional[asyncio.Semaphore] = None
+        self.singleflight: Optional[SingleFlight] = SingleFlight() if settings.LLM_COALESCE_REQUESTS else None
+        if settings.LLM_CACHE_ENABLED:
+            self.response_cache = LLMResponseCache(
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                db_path=settings.LLM_CACHE_DB_PATH,
+            )
+        self.rate_limiter: Optional[ProviderRateLimiter] = None
+        if settings.LLM_RATE_LIMIT_ENABLED:
+            self.rate_limiter = ProviderRateLimiter(
+                requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+                initial_concurrency=settings.LLM_INITIAL_CONCURRENCY,
+                min_concurrency=settings.LLM_MIN_CONCURRENCY,
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                max_retries=settings.LLM_MAX_RETRIES,
+                base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+                max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+            )
+        self.token_budget = TokenBudget(
+            margin=settings.LLM_MAX_TOKENS_MARGIN,
+            minimum=settings.LLM_MIN_OUTPUT_TOKENS,
+            maximum=settings.LLM_MAX_OUTPUT_TOKENS,
+        )
+        self._http_client: Optional[httpx.AsyncClient] = None
+    
+    async def startup(self) -> None:
+        """Create the provider client; called from the application's startup hook"""
+        if self.client is None:
+            self._setup_provider()
+    
+    async def aclose(self) -> None:
+        """Close pooled provider connections and the response cache"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self.client = None
+        if self.response_cache:
+            self.response_cache.close()
+    
+    def _ensure_client(self) -> Union[AsyncOpenAI, MockAsyncOpenAI]:
+        """Return the provider client, creating it on first use"""
+        if self.client is None:
+            self._setup_provider()
+        if self.client is None:
+            raise ValueError(f"Unsupported or uninitialized LLM provider: {self.provider}")
+        return self.client
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client shared by all provider requests"""
+        http2 = settings.LLM_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+                http2 = False
+        
+        return httpx.AsyncClient(
+            verify=settings.LLM_HTTP_VERIFY_SSL,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=self._http_timeout(),
+        )
+    
+    @staticmethod
+    def _http_timeout() -> httpx.Timeout:
+        """Per-request timeouts; also passed to the SDK, which otherwise applies its own"""
+        return httpx.Timeout(
+            connect=settings.LLM_HTTP_CONNECT_TIMEOUT_SECONDS,
+            read=settings.LLM_HTTP_READ_TIMEOUT_SECONDS,
+            write=settings.LLM_HTTP_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.LLM_HTTP_POOL_TIMEOUT_SECONDS,
+        )
+    
+    def _sdk_max_retries(self) -> int:
+        """Let the rate limiter own retries so they are not multiplied by the SDK's"""
+        return 0 if self.rate_limiter else 2
     
     def _setup_provider(self):
         """Initialize the LLM provider with API key"""
-        # Create an insecure httpx client that bypasses SSL verification
-        insecure_client = httpx.AsyncClient(verify=False)
-
         if self.provider == "openai":
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY is not set in environment variables")
+            self._http_client = self._build_http_client()
             self.client = AsyncOpenAI(
                 api_key=settings.OPENAI_API_KEY,
-                http_client=insecure_client
+                http_client=self._http_client,
+                timeout=self._http_timeout(),
+                max_retries=self._sdk_max_retries(),
             )
             self.model = settings.OPENAI_MODEL
         elif self.provider == "groq":
             if not settings.GROQ_API_KEY:
                 raise ValueError("GROQ_API_KEY is not set in environment variables")
+            self._http_client = self._build_http_client()
             self.client = AsyncOpenAI(
                 api_key=settings.GROQ_API_KEY,
                 base_url="https://api.groq.com/openai/v1",
-                http_client=insecure_client
+                http_client=self._http_client,
+                timeout=self._http_timeout(),
+                max_retries=self._sdk_max_retries(),
             )
             self.model = settings.GROQ_MODEL
+        elif self.provider == "mock":
+            self.client = MockAsyncOpenAI(
+                latency_distribution=settings.MOCK_LLM_LATENCY_DISTRIBUTION,
+                latency_ms=settings.MOCK_LLM_LATENCY_MS,
+                latency_jitter_ms=settings.MOCK_LLM_LATENCY_JITTER_MS,
+                tokens_per_second=settings.MOCK_LLM_TOKENS_PER_SECOND,
+                error_rate=settings.MOCK_LLM_ERROR_RATE,
+                error_statuses=tuple(int(code) for code in settings.MOCK_LLM_ERROR_STATUSES.split(",") if code.strip()),
+                malformed_rate=settings.MOCK_LLM_MALFORMED_RATE,
+                seed=settings.MOCK_LLM_SEED,
+            )
+            self.model = "mock"
         
-    async def generate_questions(self, resume_text: str, num_questions: int = 10, breadth: str = "Low", depth: int = 0, persona: str = "Why-How") -> Dict[str, Any]:
+    @traced("llm.generate_questions")
+    async def generate_questions(self, resume_text: str, num_questions: int = 10, breadth: str = "Low", depth: int = 0, persona: str = "Why-How", use_cache: bool = True, sharded: Optional[bool] = None) -> Dict[str, Any]:
         """Generate interview questions based on resume text.
         
         For initial question generation:
         - breadth must be "Low"
         - depth must be 0 (no nested questions)
         - persona must be "Why-How"
+        
+        Set use_cache=False to skip the response cache and sample a fresh completion.
+        Set sharded=True (or LLM_SHARDED_GENERATION) to generate one question per
+        claim concurrently instead of all questions in a single completion.
         """
+        if sharded if sharded is not None else settings.LLM_SHARDED_GENERATION:
+            return await self._generate_questions_sharded(resume_text, num_questions, breadth, depth, persona, use_cache)
+
+        system_prompt, user_prompt = self._build_generate_prompts(resume_text, num_questions, breadth, depth, persona)
+
+        try:
+            self._ensure_client()
+            
+            # Initial generation always uses Low breadth and depth 0
+            max_tokens = self.token_budget.for_questions(num_questions, "Low", 0)
+            response = await self._call_chat_api(system_prompt, user_prompt, use_cache=use_cache, max_tokens=max_tokens, purpose="generate")
+            try:
+                return self._parse_llm_response(response)
+            except Exception:
+                await self._invalidate_cached_response(system_prompt, user_prompt, max_tokens)
+                raise
+            
+        except Exception as e:
+            logger.error("Error generating questions: %s", e)
+            raise  # Don't return fallback, let the error propagate to UI
+    
+    async def _generate_questions_sharded(self, resume_text: str, num_questions: int, breadth: str, depth: int, persona: str, use_cache: bool) -> Dict[str, Any]:
+        """Generate questions in two phases: extract claims, then one small completion per claim.
+        
+        The per-claim calls run concurrently, so latency is bounded by the
+        slowest single question, and a malformed shard is retried on its own.
+        """
+        breadth, depth, persona = self._enforce_initial_controls(breadth, depth, persona)
+
+        try:
+            self._ensure_client()
+
+            claims = await self._extract_claims(resume_text, num_questions, use_cache)
+            semaphore = self._get_batch_semaphore()
+
+            async def run(index: int, claim: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._generate_claim_question(index + 1, claim, breadth, depth, persona, use_cache)
+
+            questions = list(await asyncio.gather(*(run(i, claim) for i, claim in enumerate(claims))))
+
+            if len(questions) < num_questions:
+                logger.warning("Only got %d claims, expected %d", len(questions), num_questions)
+                while len(questions) < num_questions:
+                    questions.append(self._generate_additional_question(
+                        resume_text="",
+                        question_id=len(questions) + 1,
+                        breadth="Low",
+                        depth=1,
+                        persona="Why-How"
+                    ))
+
+            return {"questions": questions}
+
+        except Exception as e:
+            logger.error("Error generating sharded questions: %s", e)
+            raise
+
+    @traced("llm.extract_claims")
+    async def _extract_claims(self, resume_text: str, num_questions: int, use_cache: bool) -> List[str]:
+        """Phase one of sharded generation: pull distinct technical claims from the resume"""
+        system_prompt = """You are an expert technical interviewer. Extract distinct, specific technical claims from a resume: concrete things the candidate says they built, decided, improved or led.
+
+Return ONLY valid JSON in this exact format:
+{"claims": ["specific claim from resume", "another specific claim from resume"]}
+
+Do not include any markdown code blocks, explanations, or other text."""
+
+        # Resume first and the count last, so calls for the same candidate share a cacheable prefix
+        user_prompt = f"""RESUME:
+{resume_text[:8000]}
+
+Extract EXACTLY {num_questions} different technical claims from this resume.
+Return only valid JSON with exactly {num_questions} claims."""
+
+        max_tokens = self.token_budget.for_claims(num_questions)
+        response = await self._call_chat_api(system_prompt, user_prompt, use_cache=use_cache, max_tokens=max_tokens, purpose="claims")
+        try:
+            data = parse_json(response)
+            claims = [
+                (claim.get("claim") if isinstance(claim, dict) else claim)
+                for claim in data.get("claims", [])
+            ]
+            claims = [claim.strip() for claim in claims if isinstance(claim, str) and claim.strip()]
+            if not claims:
+                raise ValueError("No claims found in response")
+        except Exception:
+            await self._invalidate_cached_response(system_prompt, user_prompt, max_tokens)
+            raise
+
+        return claims[:num_questions]
+
+    @traced("llm.claim_question")
+    async def _generate_claim_question(self, question_id: int, claim: str, breadth: str, depth: int, persona: str, use_cache: bool) -> Dict[str, Any]:
+        """Phase two of sharded generation: one question for one claim, retried on its own"""
+        # Static system prompt; the claim and controls vary, so they go in the user prompt
+        system_prompt = """You are an expert technical interviewer. Write ONE interview question that verifies real hands-on experience, decisions, trade-offs, and outcomes behind a single resume claim.
+
+Return ONLY valid JSON in this exact format:
+{
+  "claim": "the claim",
+  "main_question": "the main question",
+  "follow_ups": [
+    {
+      "question": "Follow-up question text",
+      "nested": []
+    }
+  ]
+}
+
+Do not include any markdown code blocks, explanations, or other text."""
+
+        user_prompt = f"""Claim: {claim}
+
+{self._generate_dynamic_prompt(breadth, depth, persona)}
+
+Return only valid JSON for one question about this claim."""
+
+        max_tokens = self.token_budget.for_question(breadth, depth)
+        attempts = settings.LLM_SHARD_RETRIES + 1
+        for attempt in range(attempts):
+            # Retries must not be answered by the cached response that just failed
+            response = await self._call_chat_api(
+                system_prompt,
+                user_prompt,
+                use_cache=use_cache and attempt == 0,
+                max_tokens=max_tokens,
+                purpose="claim_question",
+            )
+            try:
+                data = parse_json(response)
+                question = self._validate_question({
+                    "id": question_id,
+                    "claim": data.get("claim") or claim,
+                    "main_question": data["main_question"],
+                    "controls": {"breadth": breadth, "depth": depth, "persona": persona},
+                    "follow_ups": data.get("follow_ups", []),
+                })
+                if question:
+                    return question
+                raise ValueError("Question failed validation")
+            except Exception as e:
+                await self._invalidate_cached_response(system_prompt, user_prompt, max_tokens)
+                logger.warning("Shard for question %s failed (attempt %d/%d): %s", question_id, attempt + 1, attempts, e)
+
+        question = self._generate_additional_question(
+            resume_text="",
+            question_id=question_id,
+            breadth=breadth,
+            depth=depth,
+            persona=persona
+        )
+        question["claim"] = claim
+        return question
+
+    def _get_batch_semaphore(self) -> asyncio.Semaphore:
+        """Shared limit on concurrent LLM calls made by batch and sharded operations"""
+        if self._batch_semaphore is None:
+            self._batch_semaphore = asyncio.Semaphore(settings.LLM_BATCH_CONCURRENCY)
+        return self._batch_semaphore
+
+    async def stream_generate_questions(self, resume_text: str, num_questions: int = 10, breadth: str = "Low", depth: int = 0, persona: str = "Why-How", use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Generate interview questions, yielding each one as soon as it is complete.
+        
+        Yields {"type": "question", "data": question} events while the provider
+        streams its response, then a final {"type": "done", "data": {...}} event
+        whose padded count covers every generic question added to reach
+        num_questions. Token usage is recorded under "generate", and identical
+        requests in flight share one provider call unless use_cache is False.
+        """
+        system_prompt, user_prompt = self._build_generate_prompts(resume_text, num_questions, breadth, depth, persona)
+
+        self._ensure_client()
+
+        messages = self._build_messages(system_prompt, user_prompt)
+        max_tokens = self.token_budget.for_questions(num_questions, "Low", 0)
+        request_key = self._cache_key(messages, max_tokens)
+        cache_key = request_key if self.response_cache else None
+        cached = await self.response_cache.get(cache_key) if cache_key and use_cache else None
+
+        parser = QuestionStreamParser()
+        questions: List[Dict[str, Any]] = []
+        if cached is not None:
+            chunks = [cached]
+        elif self.singleflight is None or not use_cache:
+            chunks = self._stream_chat_api(messages, max_tokens=max_tokens, purpose="generate")
+        else:
+            chunks = self._stream_coalesced(request_key, messages, max_tokens, "generate")
+
+        try:
+            async for chunk in self._iterate(chunks):
+                for item in parser.feed(chunk):
+                    validated_q = self._validate_question(item)
+                    if validated_q:
+                        questions.append(validated_q)
+                        yield {"type": "question", "data": validated_q}
+        except Exception as e:
+            if cached is not None:
+                await self.response_cache.invalidate(cache_key)
+            logger.error("Error streaming questions: %s", e)
+            raise
+
+        if not questions:
+            # Nothing usable came through incrementally; fall back to the full parser
+            try:
+                fallback_questions = self._parse_llm_response(parser.text, pad=False)["questions"]
+            except Exception:
+                # A fresh response is only cached below, after it parsed
+                if cached is not None:
+                    await self.response_cache.invalidate(cache_key)
+                raise
+            for validated_q in fallback_questions:
+                questions.append(validated_q)
+                yield {"type": "question", "data": validated_q}
+
+        padded = 0
+        while len(questions) < num_questions:
+            additional_question = self._generate_additional_question(
+                resume_text="",
+                question_id=len(questions) + 1,
+                breadth="Low",
+                depth=1,
+                persona="Why-How"
+            )
+            questions.append(additional_question)
+            padded += 1
+            yield {"type": "question", "data": additional_question}
+
+        if cache_key and cached is None and parser.text:
+            await self.response_cache.set(cache_key, parser.text)
+
+        yield {"type": "done", "data": {"count": len(questions), "padded": padded, "cached": cached is not None}}
+
+    def _enforce_initial_controls(self, breadth: str, depth: int, persona: str) -> Tuple[str, int, str]:
+        """Force the fixed controls used for initial question generation"""
         # Enforce parameters for initial question generation
         if depth != 0:
-            logger.warning(f"Forcing depth=0 for initial question generation (was {depth})")
+            logger.warning("Forcing depth=0 for initial question generation (was %s)", depth)
             depth = 0
         
         if breadth != "Low":
-            logger.warning(f"Forcing breadth=Low for initial question generation (was {breadth})")
+            logger.warning("Forcing breadth=Low for initial question generation (was %s)", breadth)
             breadth = "Low"
         
         if persona != "Why-How":
-            logger.warning(f"Forcing persona=Why-How for initial question generation (was {persona})")
+            logger.warning("Forcing persona=Why-How for initial question generation (was %s)", persona)
             persona = "Why-How"
-        system_prompt = f"""You are an expert technical interviewer. Generate interview questions that verify real hands-on experience, decisions, trade-offs, and outcomes.
+        return breadth, depth, persona
+
+    @traced("llm.prompt_build")
+    def _build_generate_prompts(self, resume_text: str, num_questions: int, breadth: str, depth: int, persona: str) -> Tuple[str, str]:
+        """Build the system and user prompts for initial question generation.
+        
+        The system prompt is static and the resume opens the user prompt, with
+        per-request values last, so every call for the same candidate shares a
+        byte-identical prefix that provider-side prompt caching can reuse.
+        """
+        breadth, depth, persona = self._enforce_initial_controls(breadth, depth, persona)
+        system_prompt = """You are an expert technical interviewer. Generate interview questions that verify real hands-on experience, decisions, trade-offs, and outcomes.
 
 CRITICAL REQUIREMENTS:
-1. Generate EXACTLY {num_questions} questions (not fewer, not more)
-2. Each question must have a unique ID (1, 2, 3, ..., {num_questions})
+1. Generate EXACTLY the requested number of questions (not fewer, not more)
+2. Each question must have a unique ID (1, 2, 3, ...)
 3. Each question must be based on a DIFFERENT claim from the resume
-4. Use these EXACT parameters for ALL questions:
-   - Breadth: {breadth}
-   - Depth: {depth}
-   - Persona: {persona}
+4. Use the EXACT breadth, depth and persona requested for ALL questions
 
 IMPORTANT: 
 - When breadth is "Low": ALWAYS include exactly 1 follow-up question (even if depth is 0)
 - When breadth is "Medium" or "High": Follow depth rules for nested questions
 - When depth is 0: Follow-up questions should have empty nested arrays
 - When depth > 0: Follow-up questions should have nested questions based on depth
+- Make questions specific to the candidate's actual experience
 
 Return ONLY valid JSON in this exact format:
-{{
+{
   "questions": [
-    {{
+    {
       "id": 1,
       "claim": "specific claim from resume",
       "main_question": "the main question",
-      "controls": {{
-        "breadth": "{breadth}",
-        "depth": {depth},
-        "persona": "{persona}"
-      }},
+      "controls": {
+        "breadth": "<requested breadth>",
+        "depth": <requested depth>,
+        "persona": "<requested persona>"
+      },
       "follow_ups": [
-        {{
+        {
           "question": "Follow-up question text",
           "nested": []  # Empty when depth is 0, populated when depth > 0
-        }}
+        }
       ]
-    }},
-    {{
+    },
+    {
       "id": 2,
       "claim": "another specific claim from resume",
       "main_question": "another main question",
-      "controls": {{
-        "breadth": "{breadth}",
-        "depth": {depth},
-        "persona": "{persona}"
-      }},
+      "controls": {
+        "breadth": "<requested breadth>",
+        "depth": <requested depth>,
+        "persona": "<requested persona>"
+      },
       "follow_ups": [
-        {{
+        {
           "question": "Follow-up question text",
           "nested": []  # Empty when depth is 0, populated when depth > 0
-        }}
+        }
       ]
-    }}
-    // ... continue for all {num_questions} questions
+    }
+    // ... continue for all requested questions
   ]
-}}
+}
 
 Do not include any markdown code blocks, explanations, or other text."""
 
         # Generate dynamic instructions
         dynamic_instructions = self._generate_dynamic_prompt(breadth, depth, persona)
 
-        user_prompt = f"""Generate EXACTLY {num_questions} interview questions for this resume:
-
+        user_prompt = f"""RESUME:
 {resume_text[:8000]}
 
-CRITICAL REQUIREMENTS:
-1. Generate EXACTLY {num_questions} questions (not fewer, not more)
-2. Each question must have a unique ID (1, 2, 3, ..., {num_questions})
-3. Each question must be based on a DIFFERENT claim from the resume
-4. Use these EXACT parameters for ALL questions:
-   - Breadth: {breadth}
-   - Depth: {depth}
-   - Persona: {persona}
+REQUEST:
+Generate EXACTLY {num_questions} interview questions for this resume, with IDs 1 to {num_questions}, each based on a different technical claim.
+Use these EXACT parameters for ALL questions:
+- Breadth: {breadth}
+- Depth: {depth}
+- Persona: {persona}
 
 {dynamic_instructions}
 
-IMPORTANT: 
-- Extract {num_questions} different technical claims from the resume
-- Create one main question for each claim
-- When breadth is "Low": ALWAYS include exactly 1 follow-up question (even if depth is 0)
-- When breadth is "Medium" or "High": Follow depth rules for nested questions
-- When depth is 0: Follow-up questions should have empty nested arrays
-- When depth > 0: Follow-up questions should have nested questions based on depth
-- Make questions specific to the candidate's actual experience
-
 Return only valid JSON with exactly {num_questions} questions."""
 
-        try:
-            if self.client is None:
-                raise ValueError(f"Unsupported or uninitialized LLM provider: {self.provider}")
-            
-            response = await self._call_chat_api(system_prompt, user_prompt)
-            return self._parse_llm_response(response)
-            
-        except Exception as e:
-            logger.error(f"Error generating questions: {str(e)}")
-            raise  # Don't return fallback, let the error propagate to UI
-    
+        return system_prompt, user_prompt
+
+    @traced("llm.update_question")
     async def update_question(
         self,
         resume_text: str,
         question: Dict[str, Any],
         breadth: Optional[str] = None,
         depth: Optional[int] = None,
-        persona: Optional[str] = None
+        persona: Optional[str] = None,
+        use_cache: bool = True,
+        prompt_variant: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Regenerate follow-ups for a question based on updated parameters"""
+        """Regenerate follow-ups for a question based on updated parameters.
+        
+        prompt_variant selects the prompt layout ("compact" or "full") and
+        defaults to LLM_UPDATE_PROMPT_VARIANT, so the two can be A/B tested.
+        """
+        # Get current parameters
+        current_breadth = breadth or question.get("controls", {}).get("breadth") or question.get("breadth", "Medium")
+        current_depth = depth if depth is not None else question.get("controls", {}).get("depth") or question.get("depth", 1)
+        current_persona = persona or question.get("controls", {}).get("persona") or question.get("persona", "Why-How")
+        
+        logger.debug(
+            "Update parameters - requested: %r/%r/%r, question: %s, final: %s/%s/%s",
+            breadth, depth, persona, question.get("controls", {}), current_breadth, current_depth, current_persona
+        )
+
+        system_prompt, user_prompt = self._build_update_prompts(question, current_breadth, current_depth, current_persona, prompt_variant)
+
+        try:
+            max_tokens = self.token_budget.for_question(current_breadth, current_depth)
+            response = await self._call_chat_api(system_prompt, user_prompt, use_cache=use_cache, max_tokens=max_tokens, purpose="update")
+            log_payload(logger, "llm_response", "LLM response (%d chars): %.200s", len(response), response)
+            
+            try:
+                updated_question = self._parse_single_question(response)
+            except Exception:
+                await self._invalidate_cached_response(system_prompt, user_prompt, max_tokens)
+                raise
+            logger.debug(
+                "Parsed question depth: %s, follow-ups: %d",
+                updated_question.get("controls", {}).get("depth"), len(updated_question.get("follow_ups", []))
+            )
+            
+            # Ensure the response uses the correct parameters
+            if updated_question.get("controls"):
+                updated_question["controls"]["breadth"] = current_breadth
+                updated_question["controls"]["depth"] = current_depth
+                updated_question["controls"]["persona"] = current_persona
+            else:
+                updated_question["controls"] = {
+                    "breadth": current_breadth,
+                    "depth": current_depth,
+                    "persona": current_persona
+                }
+            
+            logger.info("Updated question with parameters - breadth: %s, depth: %s, persona: %s", current_breadth, current_depth, current_persona)
+            return updated_question
+
+        except Exception as e:
+            logger.error("Error updating question: %s", e)
+            raise
+
+    @traced("llm.prompt_build")
+    def _build_update_prompts(self, question: Dict[str, Any], breadth: str, depth: int, persona: str, variant: Optional[str] = None) -> Tuple[str, str]:
+        """Build (system, user) prompts for update_question in the requested variant"""
+        variant = (variant or settings.LLM_UPDATE_PROMPT_VARIANT).lower()
+        if variant == "compact":
+            return self._build_compact_update_prompts(question, breadth, depth, persona)
+        if variant == "full":
+            return self._build_full_update_prompts(question, breadth, depth, persona)
+        raise ValueError(f"Unknown update prompt variant: {variant}")
+
+    def _build_compact_update_prompts(self, question: Dict[str, Any], breadth: str, depth: int, persona: str) -> Tuple[str, str]:
+        """Compact layout: a fixed system prompt with the claim, main question, controls
+        and the texts of the current follow-ups.
+        
+        The count rules for the requested controls are stated once. Of the
+        current follow-ups only the question texts are sent, without their
+        nested questions, so the model keeps their focus without the full
+        indented question JSON.
+        """
+        system_prompt = """You are an expert technical interviewer. Write follow-up questions for an interview question so they match the requested controls exactly. Follow-ups must be specific to the claim, technical and detailed.
+
+Return ONLY valid JSON in this format:
+{"id":<id>,"claim":"<claim>","main_question":"<main_question>","controls":{"breadth":"<breadth>","depth":<depth>,"persona":"<persona>"},"follow_ups":[{"question":"Follow-up question text","nested":["nested question"]}]}
+
+"previous_follow_ups", when present, lists the current follow-ups: keep their focus but rewrite them to fit the requested controls.
+Use "nested" (not "nested_questions") for nested questions. Do not include any other text."""
+
+        digest = {
+            "id": question.get("id"),
+            "claim": question.get("claim", ""),
+            "main_question": question.get("main_question", ""),
+            "controls": {"breadth": breadth, "depth": depth, "persona": persona},
+        }
+        previous = [
+            follow_up.get("question") for follow_up in question.get("follow_ups") or []
+            if isinstance(follow_up, dict) and follow_up.get("question")
+        ]
+        if previous:
+            digest["previous_follow_ups"] = previous
+        user_prompt = f"""{json.dumps(digest, ensure_ascii=False, separators=(",", ":"))}
+
+{self._generate_dynamic_prompt(breadth, depth, persona)}"""
+
+        return system_prompt, user_prompt
+
+    def _build_full_update_prompts(self, question: Dict[str, Any], breadth: str, depth: int, persona: str) -> Tuple[str, str]:
+        """Original layout: full rule set in both prompts and the whole question as indented JSON"""
         system_prompt = f"""You are an expert technical interviewer. Your task is to generate follow-up questions that match the exact parameters provided.
 
 CRITICAL REQUIREMENTS:
@@ -205,17 +645,7 @@ IMPORTANT: Use "nested" (not "nested_questions") for the nested questions array.
 
 Do not include any other text or explanations."""
 
-        # Get current parameters
-        logger.info(f"DEBUG: Raw parameters - breadth: {breadth}, depth: {depth}, persona: {persona}")
-        logger.info(f"DEBUG: Question controls - {question.get('controls', {})}")
-        
-        current_breadth = breadth or question.get("controls", {}).get("breadth") or question.get("breadth", "Medium")
-        current_depth = depth if depth is not None else question.get("controls", {}).get("depth") or question.get("depth", 1)
-        current_persona = persona or question.get("controls", {}).get("persona") or question.get("persona", "Why-How")
-        
-        logger.info(f"DEBUG: Final parameters - breadth: {current_breadth}, depth: {current_depth}, persona: {current_persona}")
-
-        dynamic_instructions = self._generate_dynamic_prompt(current_breadth, current_depth, current_persona)
+        dynamic_instructions = self._generate_dynamic_prompt(breadth, depth, persona)
 
         user_prompt = f"""Generate technical follow-up questions for this interview question:
 
@@ -223,20 +653,20 @@ ORIGINAL QUESTION:
 {json.dumps(question, indent=2)}
 
 REQUIRED PARAMETERS - YOU MUST FOLLOW THESE EXACTLY:
-1. Breadth: {current_breadth}
+1. Breadth: {breadth}
    - This determines the number of follow-up questions
    - Low: EXACTLY 1 follow-up
    - Medium: EXACTLY 2-3 follow-ups
    - High: EXACTLY 4-5 follow-ups
 
-2. Depth: {current_depth}
+2. Depth: {depth}
    - This determines the number of nested questions per follow-up
    - 0: Follow-ups with NO nested questions (empty nested arrays)
    - 1: EXACTLY 1 nested question per follow-up
    - 2: EXACTLY 2-3 nested questions per follow-up
    - 3: EXACTLY 4-5 nested questions per follow-up
 
-3. Persona: {current_persona}
+3. Persona: {persona}
    - This determines the questioning style
    - Evidence-first: Ask for concrete examples and proof
    - Why-How: Focus on reasoning and decision-making
@@ -245,40 +675,59 @@ REQUIRED PARAMETERS - YOU MUST FOLLOW THESE EXACTLY:
 
 The follow-up questions should:
 1. Be specific to the claim: "{question['claim']}"
-2. Follow the {current_persona} style
+2. Follow the {persona} style
 3. Have EXACTLY the required number of follow-ups and nested questions
 4. Be technical and detailed
 
 Return only valid JSON with the updated follow-ups."""
 
-        try:
-            logger.info(f"DEBUG: Calling LLM API with depth={current_depth}")
-            response = await self._call_chat_api(system_prompt, user_prompt)
-            logger.info(f"DEBUG: LLM response length: {len(response)}")
-            logger.info(f"DEBUG: LLM response preview: {response[:200]}...")
-            
-            updated_question = self._parse_single_question(response)
-            logger.info(f"DEBUG: Parsed question depth: {updated_question.get('controls', {}).get('depth')}")
-            logger.info(f"DEBUG: Parsed question follow_ups count: {len(updated_question.get('follow_ups', []))}")
-            
-            # Ensure the response uses the correct parameters
-            if updated_question.get("controls"):
-                updated_question["controls"]["breadth"] = current_breadth
-                updated_question["controls"]["depth"] = current_depth
-                updated_question["controls"]["persona"] = current_persona
-            else:
-                updated_question["controls"] = {
-                    "breadth": current_breadth,
-                    "depth": current_depth,
-                    "persona": current_persona
-                }
-            
-            logger.info(f"Updated question with parameters - breadth: {current_breadth}, depth: {current_depth}, persona: {current_persona}")
-            return updated_question
+        return system_prompt, user_prompt
 
-        except Exception as e:
-            logger.error(f"Error updating question: {str(e)}")
-            raise
+    async def update_questions(
+        self,
+        resume_text: str,
+        questions: List[Dict[str, Any]],
+        breadth: Optional[str] = None,
+        depth: Optional[int] = None,
+        persona: Optional[str] = None,
+        use_cache: bool = True,
+        prompt_variant: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Regenerate follow-ups for several questions concurrently.
+        
+        Calls update_question for each question, at most LLM_BATCH_CONCURRENCY
+        at a time across all batch operations, and yields a result as each one finishes:
+        {"index": ..., "id": ..., "status": "success", "data": question} or
+        {"index": ..., "id": ..., "status": "error", "detail": "..."},
+        where index is the question's position in questions.
+        """
+        semaphore = self._get_batch_semaphore()
+
+        async def run(index: int, question: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    updated_question = await self.update_question(
+                        resume_text=resume_text,
+                        question=question,
+                        breadth=breadth,
+                        depth=depth,
+                        persona=persona,
+                        use_cache=use_cache,
+                        prompt_variant=prompt_variant
+                    )
+                    return {"index": index, "id": question.get("id"), "status": "success", "data": updated_question}
+                except Exception as e:
+                    logger.error("Error updating question %s in batch: %s", question.get("id"), e)
+                    return {"index": index, "id": question.get("id"), "status": "error", "detail": str(e)}
+
+        tasks = [asyncio.ensure_future(run(index, question)) for index, question in enumerate(questions)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The client went away or the caller stopped early
+            for task in tasks:
+                task.cancel()
 
     def _generate_dynamic_prompt(self, breadth: Optional[str], depth: Optional[int], persona: Optional[str]) -> str:
         """Generate dynamic prompt instructions"""
@@ -318,32 +767,213 @@ Return only valid JSON with the updated follow-ups."""
 
         return "\n".join(instructions)
     
-    async def _call_chat_api(self, system_prompt: str, user_prompt: str) -> str:
-        """Make API call to the chat completions endpoint"""
+    def _build_messages(self, system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a system/user prompt pair"""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+    
+    def _cache_key(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> str:
+        """Cache key for a completion with the current provider settings and output limit"""
+        return LLMResponseCache.make_key(self.provider, self.model, self.temperature, self._output_limit(max_tokens), messages)
+    
+    @traced("llm.call")
+    async def _call_chat_api(self, system_prompt: str, user_prompt: str, use_cache: bool = True, max_tokens: Optional[int] = None, purpose: str = "chat") -> str:
+        """Make API call to the chat completions endpoint.
+        
+        Identical requests are answered from the response cache unless
+        use_cache is False; a bypassed call still refreshes the cache.
+        Identical requests that arrive while one is in flight share its result;
+        a bypassed call always makes its own request.
+        max_tokens is the output budget for this call; actual usage is
+        recorded under purpose so the budget margin can be tuned.
+        """
+        self._ensure_client()  # resolves the model used in the cache key
+        messages = self._build_messages(system_prompt, user_prompt)
+        request_key = self._cache_key(messages, max_tokens)
+        set_attributes(purpose=purpose, cache="miss")
+        
+        if self.response_cache and use_cache:
+            cached = await self.response_cache.get(request_key)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                set_attributes(cache="hit")
+                return cached
+        
+        async def fetch() -> str:
+            start = time.perf_counter()
+            try:
+                limit = self._output_limit(max_tokens)
+                with span("llm.provider", provider=self.provider, model=self.model, max_tokens=limit) as provider_span:
+                    resp = await self._create_completion(messages, max_tokens=limit)
+                    if provider_span is not None and resp.usage is not None:
+                        provider_span.set(prompt_tokens=resp.usage.prompt_tokens, completion_tokens=resp.usage.completion_tokens)
+                content = resp.choices[0].message.content or ""
+                self._record_usage(purpose, limit, resp.usage, resp.choices[0].finish_reason)
+            except Exception as e:
+                self._observe_latency(purpose, "error", start)
+                logger.exception("LLM API error occurred")
+                raise
+            self._observe_latency(purpose, "success", start)
+            
+            if self.response_cache and content:
+                await self.response_cache.set(request_key, content)
+            return content
+        
+        if self.singleflight is None or not use_cache:
+            return await fetch()
+        return await self.singleflight.do(request_key, fetch)
+    
+    def _record_usage(self, purpose: str, max_tokens: int, usage: Any, finish_reason: Optional[str]) -> None:
+        """Record output tokens against the budget and prompt tokens served from the provider's prompt cache"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        self.token_budget.record(
+            purpose,
+            max_tokens,
+            usage.completion_tokens,
+            truncated=finish_reason == "length",
+            prompt_tokens=usage.prompt_tokens,
+            cached_tokens=cached_tokens,
+        )
+        for kind, count in (("prompt", usage.prompt_tokens), ("cached_prompt", cached_tokens), ("completion", usage.completion_tokens)):
+            if count:
+                llm_tokens.inc(count, provider=self.provider, model=self.model, type=kind)
+    
+    def _observe_latency(self, purpose: str, outcome: str, start: float) -> None:
+        """Record the latency of a provider call started at start (a perf_counter value)"""
+        llm_request_seconds.observe(
+            time.perf_counter() - start, provider=self.provider, model=self.model, purpose=purpose, outcome=outcome
+        )
+    
+    def _output_limit(self, max_tokens: Optional[int]) -> int:
+        """max_tokens to send: the per-call budget, or the ceiling when budgeting is off"""
+        if max_tokens and settings.LLM_DYNAMIC_MAX_TOKENS:
+            return max_tokens
+        return settings.LLM_MAX_OUTPUT_TOKENS
+    
+    async def _stream_chat_api(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, purpose: str = "stream") -> AsyncIterator[str]:
+        """Stream content deltas from the chat completions endpoint.
+        
+        Token usage, sent by the provider in the final chunk, is recorded under
+        purpose once the stream has been read to the end.
+        """
+        start = time.perf_counter()
+        limit = self._output_limit(max_tokens)
+        usage, finish_reason = None, None
         try:
-            resp = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.7,
-                max_tokens=4000,  # Increased token limit
-            )
-            return resp.choices[0].message.content or ""
+            stream = await self._create_completion(messages, max_tokens=limit, stream=True, stream_options={"include_usage": True})
+            # Close the provider stream as soon as this generator is closed, even if it stopped early
+            async with aclosing(stream) if hasattr(stream, "aclose") else nullcontext(stream):
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
         except Exception as e:
-            logger.exception("LLM API error occurred")
+            self._observe_latency("stream", "error", start)
+            logger.exception("LLM streaming API error occurred")
+            raise
+        self._observe_latency("stream", "success", start)
+        self._record_usage(purpose, limit, usage, finish_reason)
+
+    async def _stream_coalesced(self, request_key: str, messages: List[Dict[str, str]], max_tokens: int, purpose: str) -> AsyncIterator[str]:
+        """Stream a response, sharing it with identical requests through singleflight.
+        
+        The first caller for request_key streams the provider response as it
+        arrives; a caller that joins a call already in flight, streamed or not,
+        gets the whole text in one chunk once it completes.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def fetch() -> str:
+            parts = []
+            try:
+                async for chunk in self._stream_chat_api(messages, max_tokens=max_tokens, purpose=purpose):
+                    parts.append(chunk)
+                    queue.put_nowait(chunk)
+            finally:
+                queue.put_nowait(None)
+            return "".join(parts)
+
+        task, leading = self.singleflight.start(request_key, fetch)
+        if leading:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+        # Raises the provider error, if any; joiners get the whole text here
+        text = await asyncio.shield(task)
+        if not leading:
+            yield text
+    
+    async def _create_completion(self, messages: List[Dict[str, str]], max_tokens: int, **kwargs) -> Any:
+        """Create a chat completion, going through the rate limiter when it is enabled"""
+        client = self._ensure_client()
+        params = dict(model=self.model, messages=messages, temperature=self.temperature, max_tokens=max_tokens, **kwargs)
+        
+        if self.rate_limiter is None:
+            return await client.chat.completions.create(**params)
+        
+        estimated = estimate_tokens(messages, max_tokens)
+        request = lambda: client.chat.completions.with_raw_response.create(**params)
+        if not params.get("stream"):
+            raw = await self.rate_limiter.call(self.provider, self.model, estimated, request)
+            return raw.parse()
+        
+        # A streamed body is read after the call returns, so its concurrency slot is held until the stream closes
+        raw, release = await self.rate_limiter.call_stream(self.provider, self.model, estimated, request)
+        try:
+            stream = raw.parse()
+        except BaseException:
+            await release()
             raise
+        return self._hold_until_closed(stream, release)
     
-    def _parse_llm_response(self, response: str) -> Dict[str, Any]:
-        """Parse and validate the LLM response with improved logic"""
+    @staticmethod
+    async def _hold_until_closed(stream: Any, release: Callable[[], Awaitable[None]]) -> AsyncIterator[Any]:
+        """Yield from a provider stream, closing it and releasing its rate-limiter slot when done"""
         try:
-            # Clean the response
-            cleaned_response = self._clean_response(response)
-            logger.info(f"Cleaned response length: {len(cleaned_response)}")
-            
-            # Parse JSON
-            data = json.loads(cleaned_response)
+            async for chunk in stream:
+                yield chunk
+        finally:
+            try:
+                close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+                if close is not None:
+                    await close()
+            finally:
+                await release()
+    
+    @staticmethod
+    async def _iterate(chunks: Union[Iterable[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Iterate over plain or async chunk sources uniformly"""
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            for chunk in chunks:
+                yield chunk
+    
+    async def _invalidate_cached_response(self, system_prompt: str, user_prompt: str, max_tokens: Optional[int] = None) -> None:
+        """Drop a cached response that could not be parsed so it is not served again"""
+        if self.response_cache:
+            messages = self._build_messages(system_prompt, user_prompt)
+            await self.response_cache.invalidate(self._cache_key(messages, max_tokens))
+    
+    @traced("llm.parse")
+    def _parse_llm_response(self, response: str, pad: bool = True) -> Dict[str, Any]:
+        """Parse and validate the LLM response with improved logic.
+        
+        With pad, the questions are topped up to the expected count with
+        generic ones; callers that pad to their own count pass pad=False.
+        """
+        try:
+            # Extract and parse JSON, repairing common formatting issues
+            data = parse_json(response)
             
             # Validate structure
             if "questions" not in data or not isinstance(data["questions"], list):
@@ -351,18 +981,19 @@ Return only valid JSON with the updated follow-ups."""
             
             # Validate and fix each question
             validated_questions = []
-            for q in data["questions"]:
-                validated_q = self._validate_question(q)
-                if validated_q:
-                    validated_questions.append(validated_q)
+            with span("llm.validate", questions=len(data["questions"])):
+                for q in data["questions"]:
+                    validated_q = self._validate_question(q)
+                    if validated_q:
+                        validated_questions.append(validated_q)
             
             if not validated_questions:
                 raise ValueError("No valid questions found in response")
             
             # Check if we have the expected number of questions
             expected_count = 10  # Default expected count
-            if len(validated_questions) < expected_count:
-                logger.warning(f"Only got {len(validated_questions)} questions, expected {expected_count}")
+            if pad and len(validated_questions) < expected_count:
+                logger.warning("Only got %d questions, expected %d", len(validated_questions), expected_count)
                 # Generate additional questions to reach the expected count
                 while len(validated_questions) < expected_count:
                     additional_question = self._generate_additional_question(
@@ -377,77 +1008,14 @@ Return only valid JSON with the updated follow-ups."""
             return {"questions": validated_questions}
             
         except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            logger.debug(f"Response (first 500 chars): {response[:500]}")
+            logger.error("JSON decode error: %s", e)
+            logger.debug("Response (first 500 chars): %.500s", response)
             # Try alternative parsing methods
             return self._fallback_parse(response)
         except Exception as e:
-            logger.error(f"Error parsing LLM response: {str(e)}")
+            logger.error("Error parsing LLM response: %s", e)
             raise
 
-    def _clean_response(self, response: str) -> str:
-        """Clean the response text to extract valid JSON"""
-        if not response:
-            raise ValueError("Empty response")
-            
-        text = response.strip()
-        logger.info(f"Original response length: {len(text)}")
-        
-        # Remove markdown code blocks
-        if "```json" in text:
-            parts = text.split("```json", 1)
-            if len(parts) > 1:
-                json_part = parts[1].split("```", 1)[0]
-                text = json_part.strip()
-        elif "```" in text:
-            parts = text.split("```", 1)
-            if len(parts) > 1:
-                json_part = parts[1].split("```", 1)[0]
-                text = json_part.strip()
-        
-        # Find JSON boundaries
-        start_pos = text.find('{')
-        if start_pos == -1:
-            raise ValueError("No JSON object found in response")
-            
-        # Find the matching closing brace
-        brace_count = 0
-        end_pos = len(text)
-        
-        for i in range(start_pos, len(text)):
-            if text[i] == '{':
-                brace_count += 1
-            elif text[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_pos = i + 1
-                    break
-        
-        json_text = text[start_pos:end_pos]
-        logger.info(f"Extracted JSON text length: {len(json_text)}")
-        
-        # Fix common JSON issues
-        json_text = self._fix_json_issues(json_text)
-        
-        return json_text
-    
-    def _fix_json_issues(self, json_text: str) -> str:
-        """Fix common JSON formatting issues"""
-        # Remove trailing commas
-        json_text = re.sub(r',(\s*[}\]])', r'\1', json_text)
-        
-        # DON'T replace all newlines - this breaks JSON structure
-        # Only fix unescaped newlines within string values (not structure)
-        
-        # Fix single quotes to double quotes
-        json_text = re.sub(r"'([^']*)':", r'"\1":', json_text)
-        json_text = re.sub(r":\s*'([^']*)'", r': "\1"', json_text)
-        
-        # Remove any leading/trailing whitespace
-        json_text = json_text.strip()
-        
-        return json_text
-    
     def _validate_question(self, question: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Validate and fix a single question object"""
         try:
@@ -455,7 +1023,7 @@ Return only valid JSON with the updated follow-ups."""
             required_fields = ["id", "claim", "main_question"]
             for field in required_fields:
                 if field not in question:
-                    logger.warning(f"Missing required field: {field}")
+                    logger.warning("Missing required field: %s", field)
                     return None
             
             # Ensure controls exist with correct values
@@ -515,7 +1083,7 @@ Return only valid JSON with the updated follow-ups."""
             max_follow_ups = follow_up_counts[breadth] if isinstance(follow_up_counts[breadth], int) else follow_up_counts[breadth][1]
             
             if len(current_follow_ups) < min_follow_ups or len(current_follow_ups) > max_follow_ups:
-                logger.warning(f"Follow-up count {len(current_follow_ups)} doesn't match breadth {breadth} ({min_follow_ups}-{max_follow_ups})")
+                logger.warning("Follow-up count %d doesn't match breadth %s (%s-%s)", len(current_follow_ups), breadth, min_follow_ups, max_follow_ups)
                 return None
             
             # Validate each follow-up has correct number of nested questions
@@ -533,7 +1101,7 @@ Return only valid JSON with the updated follow-ups."""
                 
                 nested_count = len(follow_up["nested"])
                 if nested_count < min_nested or nested_count > max_nested:
-                    logger.warning(f"Nested question count {nested_count} doesn't match depth {depth} ({min_nested}-{max_nested})")
+                    logger.warning("Nested question count %d doesn't match depth %s (%s-%s)", nested_count, depth, min_nested, max_nested)
                     return None
             
             # If we get here, the structure is valid
@@ -546,7 +1114,7 @@ Return only valid JSON with the updated follow-ups."""
             return question
             
         except Exception as e:
-            logger.error(f"Error validating question: {e}")
+            logger.error("Error validating question: %s", e)
             return None
             
     def _generate_follow_up_question(self, claim: str, index: int) -> str:
@@ -571,16 +1139,11 @@ Return only valid JSON with the updated follow-ups."""
         ]
         return nested_questions[min(index - 1, len(nested_questions) - 1)]
     
+    @traced("llm.parse")
     def _parse_single_question(self, response: str) -> Dict[str, Any]:
         """Parse a single question response and ensure correct counts"""
         try:
-            logger.info(f"DEBUG: _parse_single_question - Starting to parse response")
-            cleaned_response = self._clean_response(response)
-            logger.info(f"DEBUG: Cleaned response length: {len(cleaned_response)}")
-            logger.info(f"DEBUG: Cleaned response preview: {cleaned_response[:200]}...")
-            
-            question = json.loads(cleaned_response)
-            logger.info(f"DEBUG: Successfully parsed JSON")
+            question = parse_json(response)
             
             # Get the required parameters
             controls = question.get("controls", {})
@@ -588,7 +1151,7 @@ Return only valid JSON with the updated follow-ups."""
             depth = controls.get("depth", 1)
             persona = controls.get("persona", "Why-How")
             
-            logger.info(f"DEBUG: Extracted controls - breadth: {breadth}, depth: {depth}, persona: {persona}")
+            logger.debug("Parsed question controls - breadth: %s, depth: %s, persona: %s", breadth, depth, persona)
             
             # Determine required counts
             follow_up_counts = {
@@ -655,24 +1218,27 @@ Return only valid JSON with the updated follow-ups."""
             }
             
             # Validate the final structure
-            validated_question = self._validate_question(question)
+            with span("llm.validate", questions=1):
+                validated_question = self._validate_question(question)
             if not validated_question:
                 raise ValueError("Failed to generate valid question structure")
             
             return validated_question
             
         except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error in _parse_single_question: {e}")
-            logger.error(f"Raw response: {response[:500]}")
+            logger.error("JSON decode error in _parse_single_question: %s", e)
+            log_payload(logger, "llm_response", "Raw response: %.500s", response)
             # Try fallback parsing
             return self._fallback_parse_single_question(response)
         except Exception as e:
-            logger.error(f"Error parsing single question: {e}")
+            logger.error("Error parsing single question: %s", e)
             raise
     
+    @traced("llm.fallback_parse")
     def _fallback_parse_single_question(self, response: str, breadth: str = "Medium", depth: int = 1, persona: str = "Why-How") -> Dict[str, Any]:
         """Fallback parsing for single question when JSON parsing fails"""
         logger.warning("Using fallback parsing method for single question")
+        llm_parse_fallbacks.inc(parser="single_question")
         
         # Try to extract question using regex
         question_pattern = r'"id"\s*:\s*(\d+).*?"claim"\s*:\s*"([^"]*)".*?"main_question"\s*:\s*"([^"]*)"'
@@ -820,9 +1386,11 @@ Return only valid JSON with the updated follow-ups."""
             ]
         return questions[min(nested_index, len(questions) - 1)]
 
+    @traced("llm.fallback_parse")
     def _fallback_parse(self, response: str) -> Dict[str, Any]:
         """Fallback parsing when standard JSON parsing fails"""
         logger.warning("Using fallback parsing method")
+        llm_parse_fallbacks.inc(parser="questions")
         
         # Try to extract questions using regex
         question_pattern = r'"id"\s*:\s*(\d+).*?"claim"\s*:\s*"([^"]*)".*?"main_question"\s*:\s*"([^"]*)"'
@@ -856,6 +1424,7 @@ Return only valid JSON with the updated follow-ups."""
 
     def _generate_additional_question(self, resume_text: str, question_id: int, breadth: str, depth: int, persona: str) -> Dict[str, Any]:
         """Generate an additional question when we don't have enough"""
+        llm_padded_questions.inc()
         # Generate appropriate number of follow-ups based on breadth
         follow_ups = []
         
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import httpx
+from openai import APIStatusError, InternalServerError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Characters per token used to report usage and pace output
+CHARS_PER_TOKEN = 4
+# Characters per streamed delta
+STREAM_CHUNK_CHARS = 16
+
+FOLLOW_UP_COUNTS = {"Low": 1, "Medium": 3, "High": 5}
+NESTED_COUNTS = {0: 0, 1: 1, 2: 3, 3: 5}
+
+# Controls as written by _generate_dynamic_prompt, or "Breadth: Low" in the full update prompt
+_BREADTH = re.compile(r"(?:BREADTH|Breadth:) (Low|Medium|High)")
+_DEPTH = re.compile(r"(?:DEPTH|Depth:) (\d)")
+_PERSONA = re.compile(r"(?:PERSONA|Persona:) ([\w-]+)")
+_COUNT = re.compile(r"EXACTLY (\d+)")
+
+_FOLLOW_UPS = [
+    "What alternatives did you consider before settling on this approach?",
+    "How did you measure whether the change worked?",
+    "What was the hardest trade-off you had to make along the way?",
+    "Which parts of the design would you change today, and why?",
+    "How did you get the rest of the team to adopt it?",
+]
+_NESTED = [
+    "What data did you look at to make that call?",
+    "What broke first, and how did you find out?",
+    "How long did it take to see results?",
+    "Who pushed back, and what convinced them?",
+    "What would you monitor if you shipped it again?",
+]
+
+class MockAsyncOpenAI:
+    """Stand-in for ``AsyncOpenAI`` that answers chat completions locally.
+
+    Responses are built from the prompt itself: the number of questions, the
+    breadth/depth/persona instructions and the resume lines, so they pass the
+    same validation as real output. Content is deterministic for a given
+    prompt and seed. Latency, output speed, injected errors and deliberately
+    malformed output are configurable, which makes it usable for load tests
+    without network access.
+
+    Supports the subset ``LLMService`` uses: ``chat.completions.create`` with
+    and without ``stream=True``, and ``chat.completions.with_raw_response``.
+    """
+
+    def __init__(
+        self,
+        latency_distribution: str = "lognormal",
+        latency_ms: float = 300.0,
+        latency_jitter_ms: float = 100.0,
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Tuple[int, ...] = (429, 500, 503),
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_distribution = latency_distribution.lower()
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses) or (500,)
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    async def close(self) -> None:
+        """Nothing to release; present for parity with the real client."""
+
+    def sample_latency(self) -> float:
+        """Time to first token in seconds, drawn from the configured distribution."""
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        if self.latency_distribution == "fixed":
+            value = mean
+        elif self.latency_distribution == "uniform":
+            value = self._random.uniform(mean - jitter, mean + jitter)
+        elif self.latency_distribution == "normal":
+            value = self._random.gauss(mean, jitter)
+        elif self.latency_distribution == "exponential":
+            value = self._random.expovariate(1.0 / mean) if mean > 0 else 0.0
+        elif self.latency_distribution == "lognormal":
+            # Median latency_ms, with jitter_ms controlling the spread of the tail
+            sigma = jitter / mean if mean > 0 else 0.0
+            value = mean * self._random.lognormvariate(0.0, sigma)
+        else:
+            raise ValueError(f"Unknown mock latency distribution: {self.latency_distribution}")
+        return max(0.0, value) / 1000.0
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise _status_error(self._random.choice(self.error_statuses))
+
+    def _build_content(self, messages: List[Dict[str, str]], max_tokens: Optional[int]) -> Tuple[str, str]:
+        """Return (content, finish_reason) for a prompt."""
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        rng = random.Random(_digest(self.seed, messages))
+
+        if '"claims"' in system:
+            payload: Any = {"claims": _resume_claims(user, _count(user, 10))}
+        elif user.startswith("Claim:"):
+            payload = _question(user[len("Claim:"):].split("\n", 1)[0].strip(), user, rng)
+        elif '"questions"' in system:
+            claims = _resume_claims(user, _count(user, 10))
+            payload = {"questions": [_question(claim, user, rng, question_id=i + 1) for i, claim in enumerate(claims)]}
+        else:
+            original = _original_question(user)
+            payload = _question(original.get("claim", ""), user, rng, question_id=original.get("id"))
+            payload["main_question"] = original.get("main_question", payload["main_question"])
+
+        content = json.dumps(payload, indent=2)
+        if self.malformed_rate and self._random.random() < self.malformed_rate:
+            content = _malform(content, rng)
+
+        if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+            return content[:max_tokens * CHARS_PER_TOKEN], "length"
+        return content, "stop"
+
+    def _usage(self, messages: List[Dict[str, str]], content: str) -> SimpleNamespace:
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(content) // CHARS_PER_TOKEN,
+            total_tokens=prompt_tokens + len(content) // CHARS_PER_TOKEN,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+
+    def _output_seconds(self, content: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(content) / CHARS_PER_TOKEN / self.tokens_per_second
+
+    async def create(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, stream: bool = False, **kwargs) -> Any:
+        await asyncio.sleep(self.sample_latency())
+        self._maybe_fail()
+        content, finish_reason = self._build_content(messages, max_tokens)
+        if stream:
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage", False)
+            return self._stream(content, finish_reason, self._usage(messages, content) if include_usage else None)
+
+        await asyncio.sleep(self._output_seconds(content))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+            usage=self._usage(messages, content),
+        )
+
+    async def _stream(self, content: str, finish_reason: str, usage: Optional[SimpleNamespace]) -> AsyncIterator[Any]:
+        delay = self._output_seconds(content[:STREAM_CHUNK_CHARS])
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            if delay:
+                await asyncio.sleep(delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(
+                delta=SimpleNamespace(content=content[start:start + STREAM_CHUNK_CHARS]),
+                finish_reason=None,
+            )])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)])
+        if usage is not None:
+            # Like the real API, usage arrives in a final chunk with no choices
+            yield SimpleNamespace(choices=[], usage=usage)
+
+class _Completions:
+    def __init__(self, client: MockAsyncOpenAI):
+        self._client = client
+        self.with_raw_response = SimpleNamespace(create=self._create_raw)
+
+    async def create(self, **params) -> Any:
+        return await self._client.create(**params)
+
+    async def _create_raw(self, **params) -> Any:
+        result = await self._client.create(**params)
+        return SimpleNamespace(headers=httpx.Headers(), parse=lambda: result)
+
+def _status_error(status: int) -> APIStatusError:
+    """Build the SDK exception a real provider response with this status would raise."""
+    headers = {"retry-after-ms": "100"} if status == 429 else {}
+    response = httpx.Response(
+        status,
+        headers=headers,
+        request=httpx.Request("POST", "http://mock-llm/v1/chat/completions"),
+    )
+    message = f"Injected mock provider error ({status})"
+    if status == 429:
+        return RateLimitError(message, response=response, body=None)
+    if status >= 500:
+        return InternalServerError(message, response=response, body=None)
+    return APIStatusError(message, response=response, body=None)
+
+def _digest(seed: int, messages: List[Dict[str, str]]) -> int:
+    payload = json.dumps(messages, sort_keys=True).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(str(seed).encode("utf-8") + payload).digest()[:8], "big")
+
+def _count(user: str, default: int) -> int:
+    match = _COUNT.search(user)
+    return int(match.group(1)) if match else default
+
+def _resume_claims(user: str, count: int) -> List[str]:
+    """Take claims from the resume block of the prompt, cycling if there are too few lines."""
+    resume = user.split("RESUME:", 1)[-1]
+    resume = re.split(r"\n\n(?:REQUEST:|Extract EXACTLY)", resume, 1)[0]
+    lines = [line.strip(" -*•\t") for line in resume.splitlines()]
+    lines = [line for line in lines if len(line) >= 20] or ["Built and operated production services"]
+    return [
+        lines[i % len(lines)] if i < len(lines) else f"{lines[i % len(lines)]} (part {i // len(lines) + 1})"
+        for i in range(count)
+    ]
+
+def _original_question(user: str) -> Dict[str, Any]:
+    """The question JSON embedded in an update prompt (either variant)."""
+    start = user.find("{")
+    if start == -1:
+        return {}
+    try:
+        original, _ = json.JSONDecoder().raw_decode(user, start)
+    except json.JSONDecodeError:
+        return {}
+    return original if isinstance(original, dict) else {}
+
+def _question(claim: str, user: str, rng: random.Random, question_id: Optional[int] = None) -> Dict[str, Any]:
+    breadth_match, depth_match, persona_match = _BREADTH.search(user), _DEPTH.search(user), _PERSONA.search(user)
+    breadth = breadth_match.group(1) if breadth_match else "Low"
+    depth = int(depth_match.group(1)) if depth_match else 0
+    persona = persona_match.group(1) if persona_match else "Why-How"
+
+    follow_ups = []
+    for i in range(FOLLOW_UP_COUNTS.get(breadth, 1)):
+        nested = [_NESTED[(i + j + rng.randrange(len(_NESTED))) % len(_NESTED)] for j in range(NESTED_COUNTS.get(depth, 1))]
+        follow_ups.append({"question": _FOLLOW_UPS[(i + rng.randrange(len(_FOLLOW_UPS))) % len(_FOLLOW_UPS)], "nested": nested})
+
+    question = {
+        "claim": claim,
+        "main_question": f"Walk me through how you delivered this: {claim}",
+        "controls": {"breadth": breadth, "depth": depth, "persona": persona},
+        "follow_ups": follow_ups,
+    }
+    if question_id is not None:
+        question = {"id": question_id, **question}
+    return question
+
+def _malform(content: str, rng: random.Random) -> str:
+    """Break well-formed JSON in one of the ways real models do."""
+    kind = rng.choice(["fenced", "trailing_commas", "single_quotes", "comments", "truncated"])
+    if kind == "fenced":
+        return f"Here is the JSON you asked for:\n```json\n{content}\n```"
+    if kind == "trailing_commas":
+        return re.sub(r'(["\d\]}])(\s*\n\s*[}\]])', r"\1,\2", content)
+    if kind == "single_quotes":
+        return content.replace('"', "'")
+    if kind == "comments":
+        return content.replace("\n", "  // generated\n", 3)
+    return content[:int(len(content) * 0.8)]
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ResumeParseCache:
+    """Content-addressed cache for extracted resume text.
+
+    Entries are keyed by a SHA-256 digest of the uploaded file bytes, so the
+    same resume uploaded twice (or posted to several endpoints) is only parsed
+    once. A bounded in-memory LRU sits in front of an optional on-disk tier
+    that survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content: bytes, filename: str, variant: str = "") -> str:
+        """Build a cache key from the file bytes, its extension and parser options.
+
+        Args:
+            content: Raw file content
+            filename: Original filename (the extension decides how it is parsed)
+            variant: Parser options that change the extracted text
+
+        Returns:
+            str: Hex digest identifying the parse result
+        """
+        file_ext = os.path.splitext(filename.lower())[1]
+        digest = hashlib.sha256(content)
+        digest.update(f"|{file_ext}|{variant}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for a key, or None on a miss."""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+
+        text = self._read_from_disk(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, text)
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        """Store extracted text in the memory tier and, if enabled, on disk."""
+        with self._lock:
+            self._store(key, text)
+        self._write_to_disk(key, text)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _store(self, key: str, text: str) -> None:
+        """Insert into the LRU, evicting the oldest entries. Caller holds the lock."""
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _read_from_disk(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Failed to read resume cache entry %s: %s", key, e)
+            return None
+
+    def _write_to_disk(self, key: str, text: str) -> None:
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write resume cache entry %s: %s", key, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
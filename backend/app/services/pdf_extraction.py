@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+import PyPDF2
+from PyPDF2.errors import PdfReadError
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to turn a token budget into a character budget
+CHARS_PER_TOKEN = 4
+
+def char_budget(max_chars: Optional[int] = None, max_tokens: Optional[int] = None) -> Optional[int]:
+    """Combine character and token budgets into a single character limit."""
+    budgets = [b for b in (max_chars, max_tokens * CHARS_PER_TOKEN if max_tokens else None) if b]
+    return min(budgets) if budgets else None
+
+def iter_pdf_pages(
+    pdf_file: BinaryIO,
+    max_pages: Optional[int] = None,
+    page_seconds: Optional[List[float]] = None
+) -> Iterator[str]:
+    """Yield the text of each PDF page in order, skipping pages without text.
+
+    The page count is checked before any text is extracted, so oversized
+    documents are rejected cheaply. When ``page_seconds`` is given, the
+    extraction time of every page visited is appended to it.
+
+    Raises:
+        ValueError: If the document has more than ``max_pages`` pages
+    """
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    page_count = len(pdf_reader.pages)
+    if max_pages and page_count > max_pages:
+        raise ValueError(f"PDF has {page_count} pages, the limit is {max_pages}")
+
+    for page in pdf_reader.pages:
+        start = time.perf_counter()
+        try:
+            text = page.extract_text()
+        except Exception as page_error:
+            logger.warning("Error extracting text from PDF page: %s", page_error)
+            continue
+        finally:
+            if page_seconds is not None:
+                page_seconds.append(time.perf_counter() - start)
+        if text:
+            yield text
+
+def extract_pdf_text(
+    pdf_content: bytes,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> str:
+    """Extract text from PDF bytes, stopping once ``max_chars`` have been collected.
+
+    This is a plain synchronous function so it can be shipped to a worker
+    process; it must stay importable at module level.
+    """
+    return extract_pdf_text_timed(pdf_content, max_pages, max_chars)[0]
+
+def extract_pdf_text_timed(
+    pdf_content: bytes,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> Tuple[str, List[float]]:
+    """Like ``extract_pdf_text``, also returning the extraction time of each page visited.
+
+    Timings travel back with the text because extraction may run in a worker
+    process, where the caller's metrics are not visible.
+    """
+    pdf_file = BytesIO(pdf_content)
+    page_seconds: List[float] = []
+    try:
+        separator = "\n\n"
+        text_parts = []
+        total_chars = 0
+
+        for text in iter_pdf_pages(pdf_file, max_pages=max_pages, page_seconds=page_seconds):
+            if text_parts:
+                total_chars += len(separator)
+            if max_chars and total_chars + len(text) >= max_chars:
+                text_parts.append(text[:max(0, max_chars - total_chars)])
+                break
+            text_parts.append(text)
+            total_chars += len(text)
+
+        if not any(text_parts):
+            raise ValueError("No text could be extracted from the PDF")
+
+        return separator.join(text_parts), page_seconds
+
+    except PdfReadError as e:
+        raise ValueError(f"Invalid PDF file: {str(e)}")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error processing PDF: {str(e)}")
+    finally:
+        pdf_file.close()
+
+class PdfExtractionPool:
+    """Runs PDF text extraction off the event loop.
+
+    When enabled, jobs go to a process pool so extraction scales across cores;
+    otherwise they run in-process on worker threads. Each job is bounded by a
+    timeout, and new jobs are rejected once ``max_queued`` are in flight.
+
+    A job counts as in flight until its worker is done with it, not until
+    the caller stops waiting. When a job times out in the process pool, the
+    worker processes are terminated and the pool is rebuilt, so a hung or
+    oversized PDF cannot keep a worker busy; other jobs that were running in
+    the old pool are resubmitted once, with a fresh timeout. Threads cannot be stopped, so with the
+    pool disabled a timed-out job keeps its slot until it finishes.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_workers: int = 2,
+        timeout: float = 30.0,
+        max_queued: int = 16,
+    ):
+        self.enabled = enabled
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_queued = max(1, max_queued)
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        # Pools terminated after a timeout; jobs that break with them are resubmitted
+        self._recycled: "weakref.WeakSet[Executor]" = weakref.WeakSet()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.enabled:
+                # "spawn" avoids forking a process that already runs an event loop and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-extract")
+        return self._executor
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        # Runs on the executor's thread once the job has finished, failed or been cancelled
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, pdf_content: bytes, max_pages: Optional[int], max_chars: Optional[int]) -> Tuple[Executor, Future]:
+        """Submit a job that already holds a slot; the slot is released when the job is done."""
+        executor = self._get_executor()
+        try:
+            future = executor.submit(extract_pdf_text_timed, pdf_content, max_pages, max_chars)
+        except BrokenProcessPool:
+            # The pool died since the last job; start a fresh one
+            self._executor = None
+            executor = self._get_executor()
+            future = executor.submit(extract_pdf_text_timed, pdf_content, max_pages, max_chars)
+        future.add_done_callback(self._release)
+        return executor, future
+
+    def _recycle(self, executor: Executor) -> None:
+        """Terminate a process pool's workers, abandoning their jobs, and start over with a new pool."""
+        if self._executor is executor:
+            self._executor = None
+        self._recycled.add(executor)
+        logger.warning("PDF extraction timed out, restarting the extraction worker processes")
+        terminate = getattr(executor, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+            return
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    async def extract(
+        self,
+        pdf_content: bytes,
+        max_pages: Optional[int] = None,
+        max_chars: Optional[int] = None
+    ) -> str:
+        """Extract text from PDF bytes without blocking the event loop.
+
+        Raises:
+            ValueError: If the queue is full, the job times out or extraction fails
+        """
+        return (await self.extract_timed(pdf_content, max_pages, max_chars))[0]
+
+    async def extract_timed(
+        self,
+        pdf_content: bytes,
+        max_pages: Optional[int] = None,
+        max_chars: Optional[int] = None
+    ) -> Tuple[str, List[float]]:
+        """Like ``extract``, also returning the extraction time of each page visited."""
+        with self._lock:
+            if self._in_flight >= self.max_queued:
+                raise ValueError("Too many PDF extraction jobs queued, please retry shortly")
+            self._in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        resubmitted = False
+        try:
+            executor, future = self._submit(pdf_content, max_pages, max_chars)
+        except BaseException:
+            self._release()
+            raise
+
+        while True:
+            try:
+                # On timeout this cancels the job if it has not started yet
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                if self.enabled and not future.done():
+                    self._recycle(executor)
+                raise ValueError(f"PDF extraction timed out after {self.timeout:g} seconds")
+            except BrokenProcessPool:
+                if executor in self._recycled and not resubmitted:
+                    # Killed because another job in the same pool timed out, not because of this
+                    # PDF, so it starts over with a full timeout
+                    resubmitted = True
+                    deadline = loop.time() + self.timeout
+                    with self._lock:
+                        self._in_flight += 1
+                    try:
+                        executor, future = self._submit(pdf_content, max_pages, max_chars)
+                    except BaseException:
+                        self._release()
+                        raise
+                    continue
+                logger.error("PDF extraction pool broke, it will be recreated on the next job")
+                if self._executor is executor:
+                    self._executor = None
+                raise ValueError("PDF extraction worker crashed")
+
+    def shutdown(self) -> None:
+        """Stop the workers, abandoning queued jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
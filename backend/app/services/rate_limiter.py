@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: throttling, timeouts and transient server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# A call that ran into the read timeout is retried at most this often, since each attempt can take the full timeout
+MAX_TIMEOUT_RETRIES = 1
+# Rough characters-per-token ratio for estimating prompt size before a call
+CHARS_PER_TOKEN = 4
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse rate-limit reset values such as "1s", "6m0s", "20ms" or "2m59.56s" into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Estimate the tokens a completion counts against TPM: prompt plus requested output."""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + max_tokens
+
+class TokenBucket:
+    """Async token bucket that can be re-synchronised from provider headers.
+
+    Waiters are served in arrival order. A request larger than the whole
+    bucket is clamped to its capacity so it cannot wait forever.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = max(1.0, float(capacity))
+        self.refill_per_second = max(1e-6, float(refill_per_second))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens, waiting for them if necessary. Returns seconds waited."""
+        amount = min(float(amount), self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return time.monotonic() - started
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+
+    def sync(self, limit: float, remaining: float, reset_seconds: Optional[float]) -> None:
+        """Adopt the provider's view of this bucket.
+
+        ``reset_seconds`` is the time until the bucket is full again, so the
+        refill rate is the missing amount spread over that time.
+        """
+        self._refill()
+        self.capacity = max(1.0, float(limit))
+        self.tokens = min(self.capacity, max(0.0, float(remaining)))
+        if reset_seconds and remaining < limit:
+            self.refill_per_second = max(1e-6, (limit - remaining) / reset_seconds)
+
+    def stats(self) -> Dict[str, float]:
+        self._refill()
+        return {
+            "capacity": self.capacity,
+            "available": round(self.tokens, 2),
+            "refill_per_second": round(self.refill_per_second, 4),
+        }
+
+class AIMDLimiter:
+    """Concurrency limit that grows additively on success and halves on throttling.
+
+    The limit rises by roughly one slot for every ``limit`` successful calls
+    and is cut by ``decrease_factor`` on a 429. Cuts are at most once per
+    ``cooldown`` seconds, so a burst of 429s from one overloaded window only
+    backs off once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self) -> "AIMDLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.release()
+
+    def on_success(self) -> None:
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+        logger.warning("LLM provider throttled, concurrency limit reduced to %d", self.limit)
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": int(self.limit), "in_flight": self.in_flight}
+
+class _ModelLimits:
+    """Request bucket, token bucket and concurrency limit for one provider/model."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, concurrency: AIMDLimiter):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.concurrency = concurrency
+        self.throttled = 0
+        self.retries = 0
+
+    def sync(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Update both buckets from x-ratelimit-* response headers, when present."""
+        if not headers:
+            return
+        for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = headers.get(f"x-ratelimit-limit-{name}")
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if limit is None or remaining is None:
+                continue
+            try:
+                bucket.sync(float(limit), float(remaining), parse_duration(headers.get(f"x-ratelimit-reset-{name}")))
+            except ValueError:
+                logger.debug("Ignoring malformed rate-limit headers for %s: %r, %r", name, limit, remaining)
+
+class ProviderRateLimiter:
+    """Keeps provider calls under RPM/TPM limits and retries throttled calls.
+
+    Each provider/model pair gets a request bucket and a token bucket, seeded
+    from the configured limits and then kept in line with the provider's
+    ``x-ratelimit-*`` headers, plus an AIMD concurrency limit. Calls that fail
+    with 429, 5xx or a connection error are retried with jittered exponential
+    backoff, honouring ``retry-after`` when the provider sends it. A call that
+    timed out is retried only once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limits: Dict[Tuple[str, str], _ModelLimits] = {}
+
+    def _limits_for(self, provider: str, model: str) -> _ModelLimits:
+        key = (provider, model)
+        limits = self._limits.get(key)
+        if limits is None:
+            limits = _ModelLimits(
+                self.requests_per_minute,
+                self.tokens_per_minute,
+                AIMDLimiter(self.initial_concurrency, self.min_concurrency, self.max_concurrency),
+            )
+            self._limits[key] = limits
+        return limits
+
+    async def call(
+        self,
+        provider: str,
+        model: str,
+        estimated_tokens: int,
+        request: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run ``request`` within the limits for provider/model.
+
+        ``request`` must return a raw SDK response (``with_raw_response``) so
+        its rate-limit headers can be read.
+        """
+        raw, release = await self._call(provider, model, estimated_tokens, request)
+        await release()
+        return raw
+
+    async def call_stream(
+        self,
+        provider: str,
+        model: str,
+        estimated_tokens: int,
+        request: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, Callable[[], Awaitable[None]]]:
+        """Like ``call``, for streaming responses whose body is read after it returns.
+
+        The concurrency slot stays taken until the caller awaits the returned
+        ``release`` function, which it must do once the stream is closed.
+        """
+        return await self._call(provider, model, estimated_tokens, request)
+
+    async def _call(
+        self,
+        provider: str,
+        model: str,
+        estimated_tokens: int,
+        request: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, Callable[[], Awaitable[None]]]:
+        limits = self._limits_for(provider, model)
+        attempt = 0
+        timeouts = 0
+        while True:
+            await limits.requests.acquire(1)
+            await limits.tokens.acquire(estimated_tokens)
+            await limits.concurrency.acquire()
+            try:
+                raw = await request()
+            except (APIStatusError, APIConnectionError) as e:
+                await limits.concurrency.release()
+                status = getattr(e, "status_code", None)
+                headers = e.response.headers if getattr(e, "response", None) is not None else None
+                limits.sync(headers)
+                if status == 429:
+                    limits.throttled += 1
+                    limits.concurrency.on_throttle()
+                reason = status or "connection error"
+                if isinstance(e, APITimeoutError):
+                    timeouts += 1
+                    reason = "timeout"
+                if (
+                    attempt >= self.max_retries
+                    or timeouts > MAX_TIMEOUT_RETRIES
+                    or (status is not None and status not in RETRYABLE_STATUSES)
+                ):
+                    raise
+                delay = self._backoff(attempt, headers)
+            except BaseException:
+                await limits.concurrency.release()
+                raise
+            else:
+                limits.sync(getattr(raw, "headers", None))
+                limits.concurrency.on_success()
+                return raw, self._releaser(limits.concurrency)
+
+            # Sleep outside the concurrency slot so other calls can use it
+            attempt += 1
+            limits.retries += 1
+            logger.warning("LLM call to %s/%s failed with %s, retry %d in %.2fs", provider, model, reason, attempt, delay)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _releaser(concurrency: AIMDLimiter) -> Callable[[], Awaitable[None]]:
+        """A release function for a taken concurrency slot; calling it again does nothing."""
+        released = False
+
+        async def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                await concurrency.release()
+
+        return release
+
+    def _backoff(self, attempt: int, headers: Optional[Mapping[str, str]]) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's retry-after."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = None
+        if headers:
+            retry_after_ms = headers.get("retry-after-ms")
+            if retry_after_ms is not None:
+                retry_after = parse_duration(retry_after_ms)
+                retry_after = retry_after / 1000.0 if retry_after is not None else None
+            else:
+                retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per provider/model limiter state for monitoring."""
+        return {
+            f"{provider}/{model}": {
+                "requests": limits.requests.stats(),
+                "tokens": limits.tokens.stats(),
+                "concurrency": limits.concurrency.stats(),
+                "throttled": limits.throttled,
+                "retries": limits.retries,
+            }
+            for (provider, model), limits in self._limits.items()
+        }
@@ -1,20 +1,38 @@
+import asyncio
 import logging
 import os
 from typing import Optional, Union, BinaryIO
-import PyPDF2
-from PyPDF2.errors import PdfReadError
-from io import BytesIO
+from .parse_cache import ResumeParseCache
+from ..core.metrics import pdf_page_seconds
+from ..core.tracing import set_attributes, traced
+from .pdf_extraction import PdfExtractionPool, char_budget, extract_pdf_text_timed
 
 logger = logging.getLogger(__name__)
 
 class ResumeParser:
     """Service for parsing resume content from various file formats."""
     
-    @staticmethod
-    async def parse_resume(file: Union[bytes, BinaryIO], filename: str) -> str:
+    def __init__(
+        self,
+        cache: Optional[ResumeParseCache] = None,
+        pdf_pool: Optional[PdfExtractionPool] = None,
+        max_pages: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ):
+        self.cache = cache
+        self.pdf_pool = pdf_pool
+        self.max_pages = max_pages
+        self.max_chars = char_budget(max_chars, max_tokens)
+    
+    @traced("resume.parse")
+    async def parse_resume(self, file: Union[bytes, BinaryIO], filename: str) -> str:
         """
         Parse resume content from a file.
         
+        Results are cached by a hash of the file bytes, so re-uploading the
+        same resume (or posting it to several endpoints) skips extraction.
+        
         Args:
             file: File content as bytes or file-like object
             filename: Original filename (used to determine file type)
@@ -26,58 +44,58 @@ class ResumeParser:
             ValueError: If the file type is not supported or parsing fails
         """
         try:
+            if not isinstance(file, bytes):
+                file = file.read()
+            
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResumeParseCache.make_key(
+                    file, filename, variant=f"pages={self.max_pages};chars={self.max_chars}"
+                )
+                cached_text = self.cache.get(cache_key)
+                if cached_text is not None:
+                    set_attributes(cache="hit")
+                    return cached_text
+            
             file_ext = os.path.splitext(filename.lower())[1]
+            set_attributes(file_type=file_ext, bytes=len(file))
             
             if file_ext == '.pdf':
-                return await ResumeParser._parse_pdf(file)
+                text = await self._parse_pdf(file)
             elif file_ext in ['.txt', '.md', '.markdown']:
-                if isinstance(file, bytes):
-                    return file.decode('utf-8', errors='replace')
-                return file.read().decode('utf-8', errors='replace')
+                text = file.decode('utf-8', errors='replace')
             else:
                 raise ValueError(f"Unsupported file type: {file_ext}")
+            
+            if cache_key is not None:
+                self.cache.set(cache_key, text)
+            return text
                 
         except Exception as e:
-            logger.error(f"Error parsing resume: {str(e)}")
+            logger.error("Error parsing resume: %s", e)
             raise ValueError(f"Failed to parse resume: {str(e)}")
     
-    @staticmethod
-    async def _parse_pdf(pdf_content: Union[bytes, BinaryIO]) -> str:
-        """Extract text from PDF content."""
-        try:
-            # Ensure we have a file-like object
-            if isinstance(pdf_content, bytes):
-                pdf_file = BytesIO(pdf_content)
-            else:
-                pdf_file = pdf_content
-                
-            # Reset file pointer to the beginning
-            if hasattr(pdf_file, 'seek'):
-                pdf_file.seek(0)
-                
-            # Read PDF content
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text_parts = []
-            
-            for page in pdf_reader.pages:
-                try:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                except Exception as page_error:
-                    logger.warning(f"Error extracting text from PDF page: {str(page_error)}")
-                    continue
-            
-            if not text_parts:
-                raise ValueError("No text could be extracted from the PDF")
-                
-            return "\n\n".join(text_parts)
-            
-        except PdfReadError as e:
-            raise ValueError(f"Invalid PDF file: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error processing PDF: {str(e)}")
-        finally:
-            # Clean up file-like object if we created it
-            if 'pdf_file' in locals() and isinstance(pdf_file, BytesIO):
-                pdf_file.close()
+    @traced("pdf.extract")
+    async def _parse_pdf(self, pdf_content: bytes) -> str:
+        """Extract text from PDF content without blocking the event loop.
+        
+        Documents over the page limit are rejected up front, and extraction
+        stops as soon as the character budget is reached.
+        """
+        if self.pdf_pool is None:
+            text, page_seconds = await asyncio.to_thread(
+                extract_pdf_text_timed, pdf_content, self.max_pages, self.max_chars
+            )
+        else:
+            text, page_seconds = await self.pdf_pool.extract_timed(
+                pdf_content, max_pages=self.max_pages, max_chars=self.max_chars
+            )
+        for seconds in page_seconds:
+            pdf_page_seconds.observe(seconds)
+        set_attributes(pages=len(page_seconds))
+        return text
+    
+    def shutdown(self) -> None:
+        """Release the PDF extraction workers."""
+        if self.pdf_pool is not None:
+            self.pdf_pool.shutdown()
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+class ResumeStore:
+    """Holds parsed resume text server-side behind short opaque handles.
+
+    ``/upload-resume/`` stores the text and returns a handle; the edit
+    endpoints accept that handle instead of the full text. Handles are
+    derived from the text, so uploading the same resume twice yields the
+    same handle. Entries expire ``ttl_seconds`` after their last use and the
+    least recently used are evicted beyond ``max_entries``.
+
+    Entries live in this process's memory only. With several uvicorn or
+    gunicorn workers, a handle is only known to the worker that served the
+    upload; the others answer 410 and the frontend falls back to sending the
+    full text, so nothing breaks but the savings are lost on those requests.
+    Run a single worker or route each client to the same worker (sticky
+    sessions) to keep handles effective.
+    """
+
+    def __init__(self, ttl_seconds: float = 2 * 60 * 60, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_handle(text: str) -> str:
+        """Derive the handle for a resume text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def put(self, text: str) -> str:
+        """Store resume text and return its handle."""
+        handle = self.make_handle(text)
+        with self._lock:
+            self._entries[handle] = (text, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(handle)
+            self._evict()
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        """Return the text for a handle and extend its lifetime, or None if unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[handle]
+                self.misses += 1
+                return None
+            self._entries[handle] = (entry[0], now + self.ttl_seconds)
+            self._entries.move_to_end(handle)
+            self.hits += 1
+            return entry[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _evict(self) -> None:
+        """Drop expired entries from the old end, then trim to size. Caller holds the lock."""
+        now = time.monotonic()
+        while self._entries:
+            handle, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[handle]
@@ -0,0 +1,213 @@
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import Script, ScriptFollowUp, ScriptNestedQuestion, ScriptQuestion
+
+QUESTION_FIELDS = ("id", "claim", "main_question", "controls", "follow_ups")
+CONTROL_FIELDS = ("breadth", "depth", "persona")
+FOLLOW_UP_FIELDS = ("question", "nested")
+# Lists the structural keys (follow_ups, nested) missing from the original object,
+# so they are not added back as empty lists
+ABSENT_KEY = "_absent"
+
+class QuestionRows(NamedTuple):
+    """Rows for the script_questions, script_follow_ups and script_nested_questions tables."""
+    questions: List[Dict[str, Any]]
+    follow_ups: List[Dict[str, Any]]
+    nested: List[Dict[str, Any]]
+
+def _typed(value: Any, kind: type, field: str) -> Any:
+    if value is None or (isinstance(value, kind) and not isinstance(value, bool)):
+        return value
+    raise ValueError(f"{field} has type {type(value).__name__}, expected {kind.__name__}")
+
+def _extra_json(extra: Dict[str, Any]) -> Optional[str]:
+    return json.dumps(extra) if extra else None
+
+def _extra_fields(obj: Dict[str, Any], columns: Sequence[str]) -> Dict[str, Any]:
+    """Keys without a column, plus column keys set to None, which the row cannot tell from missing ones."""
+    if ABSENT_KEY in obj:
+        raise ValueError(f"{ABSENT_KEY} is a reserved key")
+    return {key: value for key, value in obj.items() if key not in columns or value is None}
+
+def flatten_questions(questions: Any) -> QuestionRows:
+    """Split a script's question list into table rows, without the script id.
+
+    Whatever the columns cannot hold is kept in ``extra_json``: unknown
+    keys, keys set to None, an empty or partial ``controls`` object and
+    missing ``follow_ups``/``nested`` lists. ``assemble_questions`` then
+    gives back exactly the same questions. Raises ValueError when the
+    questions do not have the generated shape (a list of question objects
+    whose follow-ups hold string nested questions).
+    """
+    if not isinstance(questions, list):
+        raise ValueError("questions must be a list")
+    rows = QuestionRows([], [], [])
+    for q_pos, question in enumerate(questions):
+        if not isinstance(question, dict):
+            raise ValueError(f"question {q_pos} is not an object")
+        extra = _extra_fields(question, QUESTION_FIELDS)
+        controls = question.get("controls", {})
+        if not isinstance(controls, dict):
+            raise ValueError(f"controls of question {q_pos} is not an object")
+        if "controls" in question:
+            extra_controls = _extra_fields(controls, CONTROL_FIELDS)
+            # Also kept when empty if no column has a value, so {} comes back as {}
+            if extra_controls or all(controls.get(key) is None for key in CONTROL_FIELDS):
+                extra["controls"] = extra_controls
+        if "follow_ups" not in question:
+            extra[ABSENT_KEY] = ["follow_ups"]
+        rows.questions.append({
+            "position": q_pos,
+            "question_id": _typed(question.get("id"), int, "id"),
+            "claim": _typed(question.get("claim"), str, "claim"),
+            "main_question": _typed(question.get("main_question"), str, "main_question"),
+            "breadth": _typed(controls.get("breadth"), str, "breadth"),
+            "depth": _typed(controls.get("depth"), int, "depth"),
+            "persona": _typed(controls.get("persona"), str, "persona"),
+            "extra_json": _extra_json(extra),
+        })
+
+        follow_ups = question.get("follow_ups", [])
+        if not isinstance(follow_ups, list):
+            raise ValueError(f"follow_ups of question {q_pos} is not a list")
+        for f_pos, follow_up in enumerate(follow_ups):
+            if not isinstance(follow_up, dict):
+                raise ValueError(f"follow-up {f_pos} of question {q_pos} is not an object")
+            follow_up_extra = _extra_fields(follow_up, FOLLOW_UP_FIELDS)
+            if "nested" not in follow_up:
+                follow_up_extra[ABSENT_KEY] = ["nested"]
+            rows.follow_ups.append({
+                "question_position": q_pos,
+                "position": f_pos,
+                "question": _typed(follow_up.get("question"), str, "question"),
+                "extra_json": _extra_json(follow_up_extra),
+            })
+            nested = follow_up.get("nested", [])
+            if not isinstance(nested, list) or not all(isinstance(text, str) for text in nested):
+                raise ValueError(f"nested questions of follow-up {f_pos} of question {q_pos} must be strings")
+            rows.nested.extend(
+                {"question_position": q_pos, "follow_up_position": f_pos, "position": n_pos, "text": text}
+                for n_pos, text in enumerate(nested)
+            )
+    return rows
+
+def question_inserts(script_id: int, rows: QuestionRows) -> List[Tuple[Any, List[Dict[str, Any]]]]:
+    """Bulk INSERT statements and parameter lists for a script's rows, parents first."""
+    inserts = []
+    for model, table_rows in ((ScriptQuestion, rows.questions), (ScriptFollowUp, rows.follow_ups), (ScriptNestedQuestion, rows.nested)):
+        if table_rows:
+            inserts.append((insert(model), [dict(row, script_id=script_id) for row in table_rows]))
+    return inserts
+
+def _assemble_question(row: Any, follow_ups: Sequence[Any], nested: Dict[Tuple[int, int], List[str]]) -> Dict[str, Any]:
+    question: Dict[str, Any] = {}
+    for key, value in (("id", row.question_id), ("claim", row.claim), ("main_question", row.main_question)):
+        if value is not None:
+            question[key] = value
+    extra = json.loads(row.extra_json) if row.extra_json else {}
+    absent = extra.pop(ABSENT_KEY, [])
+    extra_controls = extra.pop("controls", None)
+    controls = {key: getattr(row, key) for key in CONTROL_FIELDS if getattr(row, key) is not None}
+    if extra_controls is not None:
+        controls.update(extra_controls)
+    if controls or extra_controls is not None:
+        question["controls"] = controls
+    if "follow_ups" not in absent:
+        question["follow_ups"] = []
+    for follow_up in follow_ups:
+        entry: Dict[str, Any] = {} if follow_up.question is None else {"question": follow_up.question}
+        follow_up_extra = json.loads(follow_up.extra_json) if follow_up.extra_json else {}
+        if "nested" not in follow_up_extra.pop(ABSENT_KEY, []):
+            entry["nested"] = nested.get((follow_up.question_position, follow_up.position), [])
+        entry.update(follow_up_extra)
+        question["follow_ups"].append(entry)
+    question.update(extra)
+    return question
+
+def assemble_questions(questions: Sequence[Any], follow_ups: Sequence[Any], nested: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Rebuild one script's question list from its rows (ORM objects or result rows)."""
+    nested_texts: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+    for row in sorted(nested, key=lambda r: (r.question_position, r.follow_up_position, r.position)):
+        nested_texts[(row.question_position, row.follow_up_position)].append(row.text)
+    follow_ups_by_question: Dict[int, List[Any]] = defaultdict(list)
+    for row in sorted(follow_ups, key=lambda r: (r.question_position, r.position)):
+        follow_ups_by_question[row.question_position].append(row)
+    return [
+        _assemble_question(row, follow_ups_by_question[row.position], nested_texts)
+        for row in sorted(questions, key=lambda r: r.position)
+    ]
+
+async def save_questions(db: AsyncSession, script_id: int, rows: QuestionRows) -> None:
+    """Insert a script's question rows; the caller commits."""
+    for statement, params in question_inserts(script_id, rows):
+        await db.execute(statement, params)
+
+async def load_questions(db: AsyncSession, script: Script) -> List[Dict[str, Any]]:
+    """The questions of a saved script, from questions_json when it is set, otherwise from the tables.
+
+    Raises ValueError if questions_json is not valid JSON.
+    """
+    if script.questions_json is not None:
+        try:
+            return json.loads(script.questions_json)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid questions_json for script {script.id}: {str(e)}")
+    questions = (await db.scalars(select(ScriptQuestion).where(ScriptQuestion.script_id == script.id))).all()
+    follow_ups = (await db.scalars(select(ScriptFollowUp).where(ScriptFollowUp.script_id == script.id))).all()
+    nested = (await db.scalars(select(ScriptNestedQuestion).where(ScriptNestedQuestion.script_id == script.id))).all()
+    return assemble_questions(questions, follow_ups, nested)
+
+async def search_questions(
+    db: AsyncSession,
+    persona: Optional[str] = None,
+    depth: Optional[int] = None,
+    breadth: Optional[str] = None,
+    claim: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Saved questions matching every given filter, across scripts.
+
+    ``claim`` matches case-insensitively anywhere in the claim. Only
+    questions stored in the tables are searched, not questions_json.
+    """
+    statement = select(ScriptQuestion)
+    if persona is not None:
+        statement = statement.where(ScriptQuestion.persona == persona)
+    if depth is not None:
+        statement = statement.where(ScriptQuestion.depth == depth)
+    if breadth is not None:
+        statement = statement.where(ScriptQuestion.breadth == breadth)
+    if claim:
+        statement = statement.where(func.lower(ScriptQuestion.claim).contains(claim.lower(), autoescape=True))
+    statement = statement.order_by(ScriptQuestion.script_id, ScriptQuestion.position).limit(limit)
+    questions = (await db.scalars(statement)).all()
+    if not questions:
+        return []
+
+    keys = [(row.script_id, row.position) for row in questions]
+    follow_ups = (await db.scalars(
+        select(ScriptFollowUp).where(tuple_(ScriptFollowUp.script_id, ScriptFollowUp.question_position).in_(keys))
+    )).all()
+    nested = (await db.scalars(
+        select(ScriptNestedQuestion).where(tuple_(ScriptNestedQuestion.script_id, ScriptNestedQuestion.question_position).in_(keys))
+    )).all()
+
+    follow_ups_by_key: Dict[Tuple[int, int], List[Any]] = defaultdict(list)
+    for row in sorted(follow_ups, key=lambda r: r.position):
+        follow_ups_by_key[(row.script_id, row.question_position)].append(row)
+    nested_by_script: Dict[int, Dict[Tuple[int, int], List[str]]] = defaultdict(lambda: defaultdict(list))
+    for row in sorted(nested, key=lambda r: r.position):
+        nested_by_script[row.script_id][(row.question_position, row.follow_up_position)].append(row.text)
+    return [
+        {
+            "script_id": row.script_id,
+            "position": row.position,
+            "question": _assemble_question(row, follow_ups_by_key[(row.script_id, row.position)], nested_by_script[row.script_id]),
+        }
+        for row in questions
+    ]
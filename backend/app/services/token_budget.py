@@ -0,0 +1,117 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Follow-ups per question and nested questions per follow-up, as (min, max).
+# These mirror the rules in LLMService._generate_dynamic_prompt and _parse_single_question.
+FOLLOW_UP_COUNTS: Dict[str, Tuple[int, int]] = {"Low": (1, 1), "Medium": (2, 3), "High": (4, 5)}
+NESTED_COUNTS: Dict[int, Tuple[int, int]] = {0: (0, 0), 1: (1, 1), 2: (2, 3), 3: (4, 5)}
+
+# Approximate output tokens for each part of the JSON the model writes
+RESPONSE_OVERHEAD_TOKENS = 20    # {"questions": [ ... ]}
+QUESTION_TOKENS = 110            # id, claim, main question and controls
+FOLLOW_UP_TOKENS = 45            # one follow-up question and its keys
+NESTED_TOKENS = 35               # one nested question
+CLAIM_TOKENS = 40                # one extracted claim in the claims list
+
+def _follow_ups(breadth: Optional[str]) -> int:
+    return FOLLOW_UP_COUNTS.get(breadth or "Medium", FOLLOW_UP_COUNTS["Medium"])[1]
+
+def _nested(depth: Any) -> int:
+    try:
+        depth = int(depth)
+    except (TypeError, ValueError):
+        depth = 1
+    return NESTED_COUNTS.get(depth, NESTED_COUNTS[1])[1]
+
+def question_tokens(breadth: Optional[str], depth: Any) -> int:
+    """Expected output tokens for one question at the upper end of its breadth/depth range."""
+    follow_ups = _follow_ups(breadth)
+    return QUESTION_TOKENS + follow_ups * (FOLLOW_UP_TOKENS + _nested(depth) * NESTED_TOKENS)
+
+class TokenBudget:
+    """Sizes ``max_tokens`` from the requested controls and tracks how well it fits.
+
+    The budget is the expected output for the requested number of questions
+    times ``margin``, clamped to ``[minimum, maximum]``. ``record`` keeps the
+    actual completion tokens per call type so the margin can be tuned from
+    ``stats()``: a high ``max_ratio`` or any ``truncated`` calls mean the
+    margin is too tight, a low ``mean_ratio`` means it is loose. Prompt
+    tokens, and how many of them the provider served from its prompt cache,
+    are tracked alongside.
+    """
+
+    def __init__(self, margin: float = 1.5, minimum: int = 128, maximum: int = 4000, window: int = 200):
+        self.margin = margin
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.window = window
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _clamp(self, expected: int) -> int:
+        return max(self.minimum, min(self.maximum, int(expected * self.margin)))
+
+    def for_questions(self, num_questions: int, breadth: Optional[str], depth: Any) -> int:
+        """Budget for a completion that returns ``{"questions": [...]}``."""
+        return self._clamp(RESPONSE_OVERHEAD_TOKENS + max(1, num_questions) * question_tokens(breadth, depth))
+
+    def for_question(self, breadth: Optional[str], depth: Any) -> int:
+        """Budget for a completion that returns a single question object."""
+        return self._clamp(question_tokens(breadth, depth))
+
+    def for_claims(self, num_claims: int) -> int:
+        """Budget for a completion that returns ``{"claims": [...]}``."""
+        return self._clamp(RESPONSE_OVERHEAD_TOKENS + max(1, num_claims) * CLAIM_TOKENS)
+
+    def record(
+        self,
+        kind: str,
+        budgeted: int,
+        used: Optional[int],
+        truncated: bool = False,
+        prompt_tokens: Optional[int] = None,
+        cached_tokens: Optional[int] = None,
+    ) -> None:
+        """Record the completion tokens a call actually used against its budget."""
+        if used is None:
+            return
+        if truncated:
+            logger.warning("LLM output for %s hit its budget of %s tokens", kind, budgeted)
+        with self._lock:
+            entry = self._usage.get(kind)
+            if entry is None:
+                entry = {
+                    "calls": 0, "truncated": 0, "budgeted": 0, "used": 0,
+                    "prompt": 0, "cached": 0, "ratios": deque(maxlen=self.window),
+                }
+                self._usage[kind] = entry
+            entry["calls"] += 1
+            entry["truncated"] += int(truncated)
+            entry["budgeted"] += budgeted
+            entry["used"] += used
+            entry["prompt"] += prompt_tokens or 0
+            entry["cached"] += cached_tokens or 0
+            entry["ratios"].append(used / budgeted if budgeted else 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return actual vs budgeted usage per call type."""
+        with self._lock:
+            report: Dict[str, Any] = {"margin": self.margin}
+            for kind, entry in self._usage.items():
+                ratios: Deque[float] = entry["ratios"]
+                report[kind] = {
+                    "calls": entry["calls"],
+                    "truncated": entry["truncated"],
+                    "budgeted_tokens": entry["budgeted"],
+                    "used_tokens": entry["used"],
+                    "mean_ratio": round(sum(ratios) / len(ratios), 3) if ratios else None,
+                    "max_ratio": round(max(ratios), 3) if ratios else None,
+                    "prompt_tokens": entry["prompt"],
+                    "cached_prompt_tokens": entry["cached"],
+                    "prompt_cache_ratio": round(entry["cached"] / entry["prompt"], 3) if entry["prompt"] else None,
+                }
+            return report
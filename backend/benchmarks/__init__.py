@@ -0,0 +1 @@
+# Benchmarks for the Interview Script Designer backend
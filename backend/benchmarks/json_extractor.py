@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON extraction from model output: the previous
+_clean_response/_fix_json_issues + json.loads pipeline against parse_json
+(C decoder fast path, fix_json_issues repair on failure) and the full
+clean_response repair path alone.
+
+Run from the backend directory:
+    python -m benchmarks.json_extractor [--iterations 200]
+"""
+
+import argparse
+import json
+import re
+import time
+from typing import Callable, Dict, List
+
+from app.services.json_extractor import clean_response, parse_json
+
+def legacy_clean_response(response: str) -> str:
+    """The brace-counting + regex cleanup that clean_response replaced."""
+    if not response:
+        raise ValueError("Empty response")
+
+    text = response.strip()
+
+    if "```json" in text:
+        parts = text.split("```json", 1)
+        if len(parts) > 1:
+            text = parts[1].split("```", 1)[0].strip()
+    elif "```" in text:
+        parts = text.split("```", 1)
+        if len(parts) > 1:
+            text = parts[1].split("```", 1)[0].strip()
+
+    start_pos = text.find('{')
+    if start_pos == -1:
+        raise ValueError("No JSON object found in response")
+
+    brace_count = 0
+    end_pos = len(text)
+    for i in range(start_pos, len(text)):
+        if text[i] == '{':
+            brace_count += 1
+        elif text[i] == '}':
+            brace_count -= 1
+            if brace_count == 0:
+                end_pos = i + 1
+                break
+
+    json_text = text[start_pos:end_pos]
+    json_text = re.sub(r',(\s*[}\]])', r'\1', json_text)
+    json_text = re.sub(r"'([^']*)':", r'"\1":', json_text)
+    json_text = re.sub(r":\s*'([^']*)'", r': "\1"', json_text)
+    return json_text.strip()
+
+def _question(question_id: int, follow_ups: int, nested: int) -> Dict:
+    return {
+        "id": question_id,
+        "claim": f"Reduced p95 latency of the {{orders}} service by 40% (claim {question_id})",
+        "main_question": "Walk me through how you found the bottleneck and what you changed.",
+        "controls": {"breadth": "Medium", "depth": 2, "persona": "Why-How"},
+        "follow_ups": [
+            {
+                "question": f"Why did you pick that approach over the alternatives? ({j})",
+                "nested": [f"How did you validate the \"fix\" under load? ({k})" for k in range(nested)],
+            }
+            for j in range(follow_ups)
+        ],
+    }
+
+def build_samples() -> Dict[str, str]:
+    """Model outputs in the shapes we see from the providers."""
+    ten = {"questions": [_question(i, 1, 0) for i in range(1, 11)]}
+    large = {"questions": [_question(i, 5, 5) for i in range(1, 31)]}
+    pretty = json.dumps(ten, indent=2)
+    return {
+        "clean": json.dumps(ten),
+        "fenced_with_prose": f"Here are the questions:\n```json\n{pretty}\n```\nLet me know if you need more.",
+        "prompt_comments": pretty.replace('"nested": []', '"nested": []  # Empty when depth is 0'),
+        "trailing_commas": pretty.replace("}\n", "},\n").replace("]\n", "],\n"),
+        "truncated": pretty[: int(len(pretty) * 0.7)],
+        "large_50kb": json.dumps(large, indent=2),
+    }
+
+def legacy_parse(response: str):
+    return json.loads(legacy_clean_response(response))
+
+def repair_parse(response: str):
+    return json.loads(clean_response(response))
+
+PIPELINES: Dict[str, Callable[[str], object]] = {
+    "legacy": legacy_parse,
+    "parse_json": parse_json,
+    "repair": repair_parse,
+}
+
+def _time(fn: Callable[[str], object], text: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            fn(text)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def _parses(fn: Callable[[str], object], text: str) -> bool:
+    try:
+        fn(text)
+        return True
+    except ValueError:
+        return False
+
+def run(iterations: int) -> List[Dict]:
+    results = []
+    for name, text in build_samples().items():
+        result = {"sample": name, "bytes": len(text)}
+        for pipeline, fn in PIPELINES.items():
+            result[f"{pipeline}_us"] = _time(fn, text, iterations)
+            result[f"{pipeline}_parses"] = _parses(fn, text)
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'sample':<20}{'bytes':>8}{'legacy µs':>12}{'parse_json µs':>15}{'repair µs':>12}{'speedup':>9}  parses (legacy/new)")
+    for r in results:
+        speedup = r["legacy_us"] / r["parse_json_us"] if r["parse_json_us"] else float("inf")
+        print(
+            f"{r['sample']:<20}{r['bytes']:>8}{r['legacy_us']:>12.1f}{r['parse_json_us']:>15.1f}"
+            f"{r['repair_us']:>12.1f}{speedup:>8.1f}x  {r['legacy_parses']}/{r['parse_json_parses']}"
+        )
+
+if __name__ == "__main__":
+    main()
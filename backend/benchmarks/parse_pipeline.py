@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the LLM output parsing pipeline: times each stage that
+turns a model response into questions and reports how many questions each
+sample's content survives as.
+
+Samples come from benchmarks/corpus/ (responses in the shapes the providers
+return: markdown fences, trailing commas, single quotes, comments, Python
+literals, truncation, refusals) plus synthetic 10-50 KB payloads built at
+run time. Expected question counts live in corpus/expected.json.
+
+Stages timed per sample, in µs per call:
+    generate samples: parse_json, _validate_question (all questions),
+                      _parse_llm_response, _fallback_parse
+    update samples:   parse_json, _parse_single_question,
+                      _fallback_parse_single_question
+
+A question counts as recovered when its claim came from the sample rather
+than from padding or a template.
+
+Run from the backend directory:
+    python -m benchmarks.parse_pipeline [--iterations 200] [--json]
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Parsing needs neither a provider client nor the on-disk response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from app.services.json_extractor import parse_json
+from app.services.llm_service import LLMService
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+SYNTHETIC_SIZES_KB = [10, 25, 50]
+
+def load_corpus() -> List[Dict[str, Any]]:
+    """Read the corpus samples listed in expected.json."""
+    with open(os.path.join(CORPUS_DIR, "expected.json")) as f:
+        expected = json.load(f)
+    samples = []
+    for path, count in expected.items():
+        with open(os.path.join(CORPUS_DIR, path), encoding="utf-8") as f:
+            text = f.read()
+        samples.append({"name": path, "kind": path.split("/", 1)[0], "text": text, "expected": count})
+    return samples
+
+def _question(question_id: int) -> Dict[str, Any]:
+    return {
+        "id": question_id,
+        "claim": f"Reduced p95 latency of service {question_id} by {question_id % 60 + 10}% with a read-through cache",
+        "main_question": "Walk me through how you found the bottleneck and what you changed.",
+        "controls": {"breadth": "Medium", "depth": 2, "persona": "Why-How"},
+        "follow_ups": [
+            {
+                "question": f"Why did you pick that approach over the alternatives? ({j})",
+                "nested": [f"How did you validate the \"fix\" under load? ({k})" for k in range(2)],
+            }
+            for j in range(3)
+        ],
+    }
+
+def synthetic_samples() -> List[Dict[str, Any]]:
+    """Large generate responses, clean and malformed, at roughly each size in SYNTHETIC_SIZES_KB."""
+    per_question = len(json.dumps(_question(1), indent=2))
+    samples = []
+    for size_kb in SYNTHETIC_SIZES_KB:
+        count = max(1, size_kb * 1024 // per_question)
+        pretty = json.dumps({"questions": [_question(i) for i in range(1, count + 1)]}, indent=2)
+        variants = {
+            "clean": pretty,
+            "fenced": f"Here are the questions:\n```json\n{pretty}\n```\nLet me know if you need more.",
+            "trailing_commas": pretty.replace("}\n", "},\n").replace("]\n", "],\n"),
+            "single_quotes": pretty.replace('\\"', "").replace('"', "'"),
+        }
+        for variant, text in variants.items():
+            samples.append({"name": f"synthetic/{size_kb}kb_{variant}", "kind": "generate", "text": text, "expected": count})
+    return samples
+
+def _time(fn: Callable[[Any], Any], args: List[Any]) -> Optional[float]:
+    """Mean µs per call over ``args``, or None if every call raised."""
+    failures = 0
+    start = time.perf_counter()
+    for arg in args:
+        try:
+            fn(arg)
+        except Exception:
+            failures += 1
+    elapsed = time.perf_counter() - start
+    if failures == len(args):
+        return None
+    return elapsed / len(args) * 1e6
+
+def _recovered(questions: List[Dict[str, Any]], text: str) -> int:
+    return sum(1 for q in questions if isinstance(q, dict) and q.get("claim") and q["claim"] in text)
+
+def _parse_path(service: LLMService, sample: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Run the production entry point once; return which path succeeded and its questions."""
+    text = sample["text"]
+    try:
+        parse_json(text)
+        path = "json"
+    except json.JSONDecodeError:
+        path = "regex"
+    except ValueError:
+        path = "none"
+    try:
+        if sample["kind"] == "generate":
+            questions = service._parse_llm_response(text)["questions"]
+        else:
+            questions = [service._parse_single_question(text)]
+    except Exception:
+        return "failed", []
+    return path, questions
+
+def bench_sample(service: LLMService, sample: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    text = sample["text"]
+    texts = [text] * iterations
+    timings: Dict[str, Optional[float]] = {"parse_json": _time(parse_json, texts)}
+
+    if sample["kind"] == "generate":
+        try:
+            parsed = parse_json(text).get("questions") or []
+        except Exception:
+            parsed = []
+        if parsed:
+            # _validate_question fills in controls and follow-ups in place, so each call gets a fresh copy
+            batches = [copy.deepcopy(parsed) for _ in range(iterations)]
+            timings["validate_question"] = _time(lambda batch: [service._validate_question(q) for q in batch], batches)
+        else:
+            timings["validate_question"] = None
+        timings["parse_llm_response"] = _time(service._parse_llm_response, texts)
+        timings["fallback_parse"] = _time(service._fallback_parse, texts)
+    else:
+        timings["parse_single_question"] = _time(service._parse_single_question, texts)
+        timings["fallback_parse_single_question"] = _time(service._fallback_parse_single_question, texts)
+
+    path, questions = _parse_path(service, sample)
+    return {
+        "sample": sample["name"],
+        "kind": sample["kind"],
+        "bytes": len(text.encode("utf-8")),
+        "path": path,
+        "expected": sample["expected"],
+        "recovered": _recovered(questions, text),
+        "returned": len(questions),
+        "timings_us": timings,
+    }
+
+def run(iterations: int, synthetic: bool = True) -> Dict[str, Any]:
+    service = LLMService()
+    samples = load_corpus() + (synthetic_samples() if synthetic else [])
+    results = [bench_sample(service, sample, iterations) for sample in samples]
+    expected = sum(r["expected"] for r in results)
+    recovered = sum(min(r["recovered"], r["expected"]) for r in results)
+    return {
+        "iterations": iterations,
+        "results": results,
+        "summary": {
+            "samples": len(results),
+            "expected_questions": expected,
+            "recovered_questions": recovered,
+            "recovery_rate": recovered / expected if expected else None,
+            "failed_samples": [r["sample"] for r in results if r["path"] == "failed" and r["expected"]],
+        },
+    }
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--no-synthetic", action="store_true", help="only run the on-disk corpus")
+    parser.add_argument("--log", action="store_true", help="keep parser logging enabled (included in timings)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    if not args.log:
+        # The parsers log every repair and fallback; keep console I/O out of the timings
+        logging.disable(logging.CRITICAL)
+
+    report = run(args.iterations, synthetic=not args.no_synthetic)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    stages = ["parse_json", "validate_question", "parse_llm_response", "fallback_parse"]
+    print(f"{'sample':<38}{'bytes':>8}  {'path':<7}{'recovered':>10}" + "".join(f"{s[:18]:>20}" for s in stages))
+    for r in report["results"]:
+        t = r["timings_us"]
+        if r["kind"] == "update":
+            row = [t["parse_json"], None, t["parse_single_question"], t["fallback_parse_single_question"]]
+        else:
+            row = [t[s] for s in stages]
+        print(
+            f"{r['sample']:<38}{r['bytes']:>8}  {r['path']:<7}{r['recovered']:>5}/{r['expected']:<4}"
+            + "".join(f"{_fmt(v):>20}" for v in row)
+        )
+    print("\nTimings are µs per call; update samples report _parse_single_question and its fallback in the last two columns.")
+
+    s = report["summary"]
+    rate = f"{s['recovery_rate']:.0%}" if s["recovery_rate"] is not None else "n/a"
+    print(f"recovered {s['recovered_questions']}/{s['expected_questions']} questions ({rate}) across {s['samples']} samples")
+    if s["failed_samples"]:
+        print(f"failed: {', '.join(s['failed_samples'])}")
+
+if __name__ == "__main__":
+    main()
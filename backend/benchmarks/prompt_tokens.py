@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Report input tokens per update_question call for the "full" and "compact"
+prompt variants across every breadth/depth/persona combination.
+
+Tokens are counted with tiktoken when it is installed, otherwise estimated
+at ~4 characters per token.
+
+Run from the backend directory:
+    python -m benchmarks.prompt_tokens [--follow-ups 3] [--json]
+"""
+
+import argparse
+import json
+import os
+from typing import Callable, Dict, List
+
+# Building prompts needs neither a provider client nor the on-disk response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from app.services.llm_service import LLMService
+
+BREADTHS = ["Low", "Medium", "High"]
+DEPTHS = [0, 1, 2, 3]
+PERSONAS = ["Evidence-first", "Why-How", "Metrics-driven", "Storytelling"]
+VARIANTS = ["full", "compact"]
+
+def token_counter() -> Callable[[str], int]:
+    """Return a token counting function, exact if tiktoken is available."""
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: max(1, len(text) // 4)
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+def sample_question(follow_ups: int) -> Dict:
+    """A question as the frontend sends it to /update-question/."""
+    return {
+        "id": 3,
+        "claim": "Reduced p95 latency of the orders service by 40% by introducing a read-through cache",
+        "main_question": "Walk me through how you found the bottleneck in the orders service and what you changed.",
+        "controls": {"breadth": "Medium", "depth": 1, "persona": "Why-How"},
+        "follow_ups": [
+            {
+                "question": "Why did you choose a read-through cache over denormalising the hot tables?",
+                "nested": ["How did you handle invalidation when an order was updated?"],
+            }
+            for _ in range(follow_ups)
+        ],
+    }
+
+def run(follow_ups: int) -> List[Dict]:
+    service = LLMService()
+    count = token_counter()
+    question = sample_question(follow_ups)
+    results = []
+    for breadth in BREADTHS:
+        for depth in DEPTHS:
+            for persona in PERSONAS:
+                result = {"breadth": breadth, "depth": depth, "persona": persona}
+                for variant in VARIANTS:
+                    system_prompt, user_prompt = service._build_update_prompts(question, breadth, depth, persona, variant)
+                    result[f"{variant}_tokens"] = count(system_prompt) + count(user_prompt)
+                results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--follow-ups", type=int, default=3, help="follow-ups already on the question being regenerated")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.follow_ups)
+    full_total = sum(r["full_tokens"] for r in results)
+    compact_total = sum(r["compact_tokens"] for r in results)
+    summary = {
+        "calls": len(results),
+        "mean_full_tokens": full_total / len(results),
+        "mean_compact_tokens": compact_total / len(results),
+        "reduction": 1 - compact_total / full_total,
+    }
+    if args.json:
+        print(json.dumps({"results": results, "summary": summary}, indent=2))
+        return
+
+    print(f"{'breadth':<8}{'depth':>6}  {'persona':<16}{'full':>7}{'compact':>9}{'saved':>8}")
+    for r in results:
+        saved = 1 - r["compact_tokens"] / r["full_tokens"]
+        print(
+            f"{r['breadth']:<8}{r['depth']:>6}  {r['persona']:<16}"
+            f"{r['full_tokens']:>7}{r['compact_tokens']:>9}{saved:>7.0%}"
+        )
+    print(
+        f"\nmean input tokens per call: full {summary['mean_full_tokens']:.0f}, "
+        f"compact {summary['mean_compact_tokens']:.0f} ({summary['reduction']:.0%} smaller)"
+    )
+
+if __name__ == "__main__":
+    main()
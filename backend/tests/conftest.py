@@ -0,0 +1,9 @@
+import os
+
+# Settings are read when the app modules are imported, so pin them first:
+# local mock provider, in-memory database and no on-disk caches
+os.environ["LLM_PROVIDER"] = "mock"
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["LLM_CACHE_DB_PATH"] = ""
+os.environ["RESUME_CACHE_DIR"] = ""
+os.environ["LOG_LEVEL"] = "WARNING"
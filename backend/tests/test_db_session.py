@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.session import _apply_sqlite_profile, _engine_options, async_database_url, sqlite_pragmas, sync_database_url
+
+def test_sqlite_pragmas():
+    assert sqlite_pragmas("wal", "normal", 2500) == [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA busy_timeout=2500",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+@pytest.mark.parametrize("journal_mode, synchronous", [("WAL; DROP TABLE scripts", "NORMAL"), ("WAL", "SOMETIMES")])
+def test_sqlite_pragmas_reject_unknown_values(journal_mode, synchronous):
+    with pytest.raises(ValueError):
+        sqlite_pragmas(journal_mode, synchronous, 1000)
+
+def test_database_url_forms():
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert sync_database_url("sqlite+aiosqlite:///./app.db") == "sqlite:///./app.db"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@db/app")
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:mem?mode=memory&uri=true"])
+def test_in_memory_sqlite_engines_share_one_static_connection(url):
+    assert "pool_size" not in _engine_options(url)
+    engine = create_engine(url, **_engine_options(url))
+    _apply_sqlite_profile(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
+
+@pytest.mark.asyncio
+async def test_in_memory_async_engine_can_be_created():
+    url = async_database_url("sqlite://")
+    engine = create_async_engine(url, **_engine_options(url))
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+    await engine.dispose()
+
+def test_file_sqlite_uses_one_pooled_connection(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    options = _engine_options(url)
+    assert (options["pool_size"], options["max_overflow"]) == (1, 0)
+
+def test_profile_applies_pragmas_and_begins_immediate(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    _apply_sqlite_profile(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    with engine.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    assert statements[0] == "BEGIN IMMEDIATE"
+
+    statements.clear()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT 1"))
+    assert "BEGIN IMMEDIATE" not in statements
+    engine.dispose()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from app.services.json_extractor import JsonScanner, clean_response, fix_json_issues, parse_json
+from app.services.json_stream import QuestionStreamParser
+
+def test_braces_inside_strings_are_ignored():
+    text = '{"q": "Use a } char", "items": [1,2,],}'
+    assert parse_json(text) == {"q": "Use a } char", "items": [1, 2]}
+    assert json.loads(clean_response(text)) == {"q": "Use a } char", "items": [1, 2]}
+
+def test_well_formed_object_is_found_in_prose_and_fences():
+    text = 'Here you go:\n```json\n{"a": {"b": [1, "{"]}}\n```\nAnything else?'
+    assert parse_json(text) == {"a": {"b": [1, "{"]}}
+    assert json.loads(clean_response(text)) == {"a": {"b": [1, "{"]}}
+
+@pytest.mark.parametrize("broken, expected", [
+    ('{"a": [1, 2,], "b": {"c": 1,},}', {"a": [1, 2], "b": {"c": 1}}),
+    ("{'a': 'it\\'s', 'b': \"x\"}", {"a": "it's", "b": "x"}),
+    ('{a: 1, b_2: "x"}', {"a": 1, "b_2": "x"}),
+    ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ('{"a": 1, // note\n "b": 2 /* more */, # last\n}', {"a": 1, "b": 2}),
+    ('{"a": "line\nbreak\ttab"}', {"a": "line\nbreak\ttab"}),
+])
+def test_common_model_mistakes_are_repaired(broken, expected):
+    assert parse_json(broken) == expected
+
+def test_repair_leaves_string_contents_alone():
+    text = '{"a": "True, None, // not a comment, #nor this, {x: 1,}"}'
+    assert fix_json_issues(text) == text
+
+def test_missing_object_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_json("no json here")
+    with pytest.raises(ValueError):
+        clean_response("")
+
+def test_truncated_object_raises_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json('{"a": [1, 2')
+
+def test_scanner_finds_object_bounds_across_chunks():
+    text = 'prefix {"a": "\\"}\\\\", "b": [{"c": "]"}]} suffix'
+    scanner = JsonScanner()
+    for char in text:
+        scanner.feed(char)
+    assert scanner.done
+    assert text[scanner.start:scanner.end] == '{"a": "\\"}\\\\", "b": [{"c": "]"}]}'
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_stream_parser_yields_each_question_once(chunk_size):
+    questions = [{"id": i, "claim": "a } { \" [ ] \\", "follow_ups": [{"nested": ["}"]}]} for i in range(4)]
+    text = "```json\n" + json.dumps({"note": "questions", "questions": questions}) + "\n```"
+    parser = QuestionStreamParser()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[start:start + chunk_size]))
+    assert items == questions
+    assert parser.done
+
+def test_stream_parser_skips_malformed_items():
+    parser = QuestionStreamParser()
+    items = parser.feed('{"questions": [{"id": 1,}, {"id": 2}]}')
+    assert items == [{"id": 2}]
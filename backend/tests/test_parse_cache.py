@@ -0,0 +1,35 @@
+from app.services.parse_cache import ResumeParseCache
+
+def test_key_depends_on_content_extension_and_variant():
+    key = ResumeParseCache.make_key(b"resume", "cv.pdf")
+    assert key == ResumeParseCache.make_key(b"resume", "other-name.PDF")
+    assert key != ResumeParseCache.make_key(b"resume!", "cv.pdf")
+    assert key != ResumeParseCache.make_key(b"resume", "cv.docx")
+    assert key != ResumeParseCache.make_key(b"resume", "cv.pdf", variant="ocr")
+
+def test_get_and_set_count_hits_and_misses():
+    cache = ResumeParseCache()
+    assert cache.get("a") is None
+    cache.set("a", "text")
+    assert cache.get("a") == "text"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResumeParseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    ResumeParseCache(cache_dir=str(tmp_path)).set("abcdef", "text")
+    cache = ResumeParseCache(cache_dir=str(tmp_path))
+    assert cache.get("abcdef") == "text"
+    assert cache.stats()["disk_hits"] == 1
+    # Promoted to the memory tier
+    assert cache.get("abcdef") == "text"
+    assert cache.stats()["hits"] == 1
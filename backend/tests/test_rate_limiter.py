@@ -0,0 +1,98 @@
+import httpx
+import pytest
+from openai import APIStatusError, APITimeoutError
+
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import ProviderRateLimiter, parse_duration
+
+_REQUEST = httpx.Request("POST", "https://provider.test/v1/chat/completions")
+
+def _status_error(status: int) -> APIStatusError:
+    response = httpx.Response(status, headers={"retry-after-ms": "1"}, request=_REQUEST)
+    return APIStatusError(f"status {status}", response=response, body=None)
+
+class _Raw:
+    headers = httpx.Headers()
+
+def _requests(*outcomes):
+    """A request callable that raises or returns each outcome in turn, counting calls."""
+    outcomes = list(outcomes)
+
+    async def request():
+        request.calls += 1
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    request.calls = 0
+    return request
+
+def _in_flight(limiter: ProviderRateLimiter) -> int:
+    return limiter.stats()["mock/model"]["concurrency"]["in_flight"]
+
+@pytest.mark.parametrize("value, seconds", [("1s", 1.0), ("6m0s", 360.0), ("20ms", 0.02), ("2.5", 2.5), ("", None), ("soon", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+@pytest.mark.asyncio
+async def test_throttled_call_is_retried_and_releases_its_slot():
+    limiter = ProviderRateLimiter(base_delay=0.001)
+    raw = _Raw()
+    request = _requests(_status_error(429), _status_error(503), raw)
+    assert await limiter.call("mock", "model", 10, request) is raw
+    assert request.calls == 3
+    assert _in_flight(limiter) == 0
+    assert limiter.stats()["mock/model"]["throttled"] == 1
+    assert limiter.stats()["mock/model"]["retries"] == 2
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    limiter = ProviderRateLimiter(base_delay=0.001)
+    request = _requests(_status_error(400))
+    with pytest.raises(APIStatusError):
+        await limiter.call("mock", "model", 10, request)
+    assert request.calls == 1
+    assert _in_flight(limiter) == 0
+
+@pytest.mark.asyncio
+async def test_timeouts_are_retried_at_most_once():
+    limiter = ProviderRateLimiter(base_delay=0.001)
+    request = _requests(APITimeoutError(_REQUEST), APITimeoutError(_REQUEST), _Raw())
+    with pytest.raises(APITimeoutError):
+        await limiter.call("mock", "model", 10, request)
+    assert request.calls == 2
+    assert _in_flight(limiter) == 0
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_retries():
+    limiter = ProviderRateLimiter(base_delay=0.001, max_retries=2)
+    request = _requests(*[_status_error(500)] * 5)
+    with pytest.raises(APIStatusError):
+        await limiter.call("mock", "model", 10, request)
+    assert request.calls == 3
+    assert _in_flight(limiter) == 0
+
+@pytest.mark.asyncio
+async def test_stream_slot_is_held_until_released_once():
+    limiter = ProviderRateLimiter()
+    raw, release = await limiter.call_stream("mock", "model", 10, _requests(_Raw()))
+    assert _in_flight(limiter) == 1
+    await release()
+    await release()
+    assert _in_flight(limiter) == 0
+
+@pytest.mark.asyncio
+async def test_stream_closed_early_releases_its_slot():
+    limiter = ProviderRateLimiter()
+
+    async def chunks():
+        for chunk in ("a", "b", "c"):
+            yield chunk
+
+    _, release = await limiter.call_stream("mock", "model", 10, _requests(_Raw()))
+    stream = LLMService._hold_until_closed(chunks(), release)
+    assert await stream.__anext__() == "a"
+    assert _in_flight(limiter) == 1
+    await stream.aclose()
+    assert _in_flight(limiter) == 0
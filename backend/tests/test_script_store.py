@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.script_store import assemble_questions, flatten_questions
+
+def _round_trip(questions):
+    rows = flatten_questions(questions)
+    as_rows = lambda table: [SimpleNamespace(**row) for row in table]
+    # Rows come back from the database in no particular order
+    return assemble_questions(
+        as_rows(reversed(rows.questions)), as_rows(reversed(rows.follow_ups)), as_rows(reversed(rows.nested))
+    )
+
+GENERATED = [
+    {
+        "id": 1,
+        "claim": "Built a Kafka pipeline",
+        "main_question": "How did you size the cluster?",
+        "controls": {"breadth": "Medium", "depth": 2, "persona": "Why-How"},
+        "follow_ups": [
+            {"question": "Why Kafka?", "nested": ["What else did you consider?", "What did it cost?"]},
+            {"question": "How did you test it?", "nested": []},
+        ],
+    },
+    {
+        "id": 2,
+        "claim": "Led a migration",
+        "main_question": "What broke first?",
+        "controls": {"breadth": "Low", "depth": 0, "persona": "Metrics-driven"},
+        "follow_ups": [],
+    },
+]
+
+@pytest.mark.parametrize("questions", [
+    GENERATED,
+    [],
+    [{"id": 1, "claim": None, "main_question": "Q?", "controls": {}, "follow_ups": []}],
+    [{"id": 1, "main_question": "Q?", "controls": {"breadth": "High", "custom": True}}],
+    [{"main_question": "Q?", "source": "manual", "follow_ups": [{"question": "F?", "note": "x"}, {"nested": ["N?"]}]}],
+])
+def test_questions_survive_the_round_trip(questions):
+    assert _round_trip(questions) == questions
+
+def test_rows_hold_the_generated_shape_without_extra_json():
+    rows = flatten_questions(GENERATED)
+    assert [row["extra_json"] for row in rows.questions + rows.follow_ups] == [None] * 4
+    assert [(row["question_position"], row["follow_up_position"], row["position"]) for row in rows.nested] == [(0, 0, 0), (0, 0, 1)]
+
+@pytest.mark.parametrize("questions", [
+    {"questions": []},
+    ["not an object"],
+    [{"id": "1"}],
+    [{"controls": []}],
+    [{"follow_ups": {}}],
+    [{"follow_ups": [{"nested": [1]}]}],
+])
+def test_other_shapes_are_rejected(questions):
+    with pytest.raises(ValueError):
+        flatten_questions(questions)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_service import LLMService
+from app.services.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+
+    async def fetch():
+        return object()
+
+    first, other = await asyncio.gather(flight.do("a", fetch), flight.do("b", fetch))
+    assert first is not other
+    assert await flight.do("a", fetch) is not first
+    assert flight.stats()["calls"] == 3
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.do("key", fetch), flight.do("key", fetch), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("key", fetch))
+    second = asyncio.ensure_future(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "done"
+
+@pytest.mark.asyncio
+async def test_start_reports_whether_the_caller_leads():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return 1
+
+    task, leading = flight.start("key", fetch)
+    joined, joined_leading = flight.start("key", fetch)
+    assert leading and not joined_leading
+    assert joined is task
+    assert await task == 1
+
+@pytest.mark.asyncio
+async def test_llm_calls_coalesce_unless_the_cache_is_bypassed():
+    service = LLMService()
+    service.response_cache = None
+    calls = [service._call_chat_api("system", "user", max_tokens=50) for _ in range(3)]
+    assert len(set(await asyncio.gather(*calls))) == 1
+    assert service.singleflight.stats()["coalesced"] == 2
+
+    bypassed = [service._call_chat_api("system", "user", use_cache=False, max_tokens=50) for _ in range(3)]
+    await asyncio.gather(*bypassed)
+    assert service.singleflight.stats()["calls"] == 1
@@ -4,9 +4,54 @@ import axios from 'axios';
 // Define the API base URL
 const API_URL = 'http://localhost:8000/api/v1';
 
+// Read a text/event-stream body and call onEvent(event, data) for every complete event
+const readServerSentEvents = async (body, onEvent) => {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+};
+
+// POST an edit request with the resume handle, resending the full text if the server has dropped it
+const postWithResume = async (path, body, { resumeHandle, resumeText }) => {
+  const config = {
+    headers: {
+      'Content-Type': 'application/json',
+    },
+  };
+  if (resumeHandle) {
+    try {
+      return await axios.post(`${API_URL}${path}`, { resume_handle: resumeHandle, ...body }, config);
+    } catch (error) {
+      if (error.response?.status !== 410) throw error;
+    }
+  }
+  return axios.post(`${API_URL}${path}`, { resume_text: resumeText || "", ...body }, config);
+};
+
 const useQuestionsStore = create((set, get) => ({
   questions: [],
   resumeText: "", // Store the original resume text
+  resumeHandle: null, // Server-side handle for the resume text, sent instead of the text on edits
   loading: false,
   error: null,
   updatingQuestions: new Set(), // Track which questions are being updated
@@ -26,20 +71,27 @@ const useQuestionsStore = create((set, get) => ({
       });
 
       const resumeText = uploadResponse.data.resume_text;
-      set({ resumeText }); // Store the resume text
+      const resumeHandle = uploadResponse.data.resume_handle || null;
+      set({ resumeText, resumeHandle }); // Store the resume text and its handle
 
-      // Then generate questions using the same file with specified parameters
-      const generateResponse = await axios.post(`${API_URL}/generate-questions/`, formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-          'num_questions': '10',
-          'depth': '0',  // No depth for initial questions
-          'breadth': 'Low',  // Low breadth by default
-          'persona': 'Why-How'
-        },
+      // Then stream generated questions for the same file; each one is shown as soon as it arrives
+      const response = await fetch(`${API_URL}/generate-questions/stream/`, {
+        method: 'POST',
+        body: formData,
       });
+      if (!response.ok || !response.body) {
+        throw new Error(`Question generation failed with status ${response.status}`);
+      }
 
-      set({ questions: generateResponse.data.data.questions, loading: false });
+      set({ questions: [] });
+      await readServerSentEvents(response.body, (event, data) => {
+        if (event === 'question') {
+          set(state => ({ questions: [...state.questions, data], loading: false }));
+        } else if (event === 'error') {
+          throw new Error(data.detail);
+        }
+      });
+      set({ loading: false });
     } catch (error) {
       console.error('Error generating questions:', error);
       set({ error: 'Failed to generate questions.', loading: false });
@@ -51,7 +103,7 @@ const useQuestionsStore = create((set, get) => ({
     console.log('DEBUG: updateQuestion called with:', { questionId, updatedFields });
     
     const currentQuestions = get().questions;
-    const resumeText = get().resumeText; // Get the stored resume text
+    const { resumeText, resumeHandle } = get(); // Get the stored resume text and handle
     const originalQuestion = currentQuestions.find(q => q.id === questionId);
     
     console.log('DEBUG: Original question controls:', originalQuestion?.controls);
@@ -79,7 +131,6 @@ const useQuestionsStore = create((set, get) => ({
 
       // Prepare the request data with only the necessary fields
       const requestData = {
-        resume_text: resumeText,
         question: cleanQuestion,
         ...(updatedFields.breadth !== undefined && { breadth: updatedFields.breadth }),
         ...(updatedFields.depth !== undefined && { depth: updatedFields.depth }),
@@ -89,11 +140,7 @@ const useQuestionsStore = create((set, get) => ({
 
       console.log('DEBUG: Request data being sent:', requestData);
 
-      const response = await axios.post(`${API_URL}/update-question/`, requestData, {
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
+      const response = await postWithResume('/update-question/', requestData, { resumeHandle, resumeText });
       // Replace the optimistically updated question with the actual response
       // The backend returns {status: "success", data: updated_question}
       const updatedQuestion = response.data.data;
@@ -131,7 +178,7 @@ const useQuestionsStore = create((set, get) => ({
   addQuestion: async (questionData) => {
     set({ loading: true, error: null });
     try {
-      const resumeText = get().resumeText;
+      const { resumeText, resumeHandle } = get();
       
       // Generate a unique ID for the new question
       const currentQuestions = get().questions;
@@ -140,7 +187,6 @@ const useQuestionsStore = create((set, get) => ({
       
       // Prepare the request data
       const requestData = {
-        resume_text: resumeText,
         question: {
           id: newId,
           main_question: questionData.main_question,
@@ -151,11 +197,7 @@ const useQuestionsStore = create((set, get) => ({
         }
       };
 
-      const response = await axios.post(`${API_URL}/add-question/`, requestData, {
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
+      const response = await postWithResume('/add-question/', requestData, { resumeHandle, resumeText });
 
       const newQuestion = response.data.data;
       
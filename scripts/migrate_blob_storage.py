@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Move saved scripts' resume_text into the content-addressed blobs table and
+report how much storage that saves.
+
+The script:
+  1. creates the blobs table and adds scripts.resume_blob_hash,
+  2. stores each distinct resume once, compressed with BLOB_COMPRESSION,
+     points its scripts at it and clears their resume_text, in batches,
+  3. prints resume bytes before and after, split into what deduplication
+     and what compression saved.
+
+Running it again only picks up scripts that still have resume_text.
+With --dry-run nothing is written and the report shows what the migration
+would save. On SQLite, --vacuum also shrinks the database file afterwards.
+Back up the database first.
+
+Usage (from the project root, with the backend's DATABASE_URL):
+    python scripts/migrate_blob_storage.py [--batch-size 500] [--dry-run] [--vacuum]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from sqlalchemy import inspect, select, text, update
+
+from app.core.config import settings
+from app.db.session import Base, SessionLocal, engine
+from app.models.models import Blob, Script
+from app.services.blob_store import BlobCodec, blob_insert
+
+def add_blob_column(conn) -> bool:
+    """Add scripts.resume_blob_hash; returns False if it already exists."""
+    inspector = inspect(conn)
+    if "resume_blob_hash" in {column["name"] for column in inspector.get_columns("scripts")}:
+        return False
+    conn.execute(text("ALTER TABLE scripts ADD COLUMN resume_blob_hash VARCHAR(64) REFERENCES blobs (hash)"))
+    conn.execute(text("CREATE INDEX ix_scripts_resume_blob_hash ON scripts (resume_blob_hash)"))
+    return True
+
+def database_file_size() -> int:
+    """Size of the SQLite database in bytes, or 0 for other databases."""
+    if engine.dialect.name != "sqlite":
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+
+def migrate(codec: BlobCodec, batch_size: int, dry_run: bool) -> dict:
+    """Store resume_text as blobs, batch_size scripts per transaction."""
+    stats = {"scripts": 0, "resume_bytes": 0, "distinct_resumes": 0, "distinct_bytes": 0, "stored_bytes": 0, "already_stored": 0}
+    # A dry run may happen before the blobs table exists
+    blobs_exist = "blobs" in inspect(engine).get_table_names()
+    seen = set()
+    last_id = 0
+    with SessionLocal() as db:
+        dialect_name = db.get_bind().dialect.name
+        while True:
+            # Only the columns every schema version has, so this also runs before the new column exists
+            scripts = db.execute(
+                select(Script.id, Script.resume_text)
+                .where(Script.resume_text.is_not(None), Script.id > last_id)
+                .order_by(Script.id)
+                .limit(batch_size)
+            ).all()
+            if not scripts:
+                break
+            for script_id, resume_text in scripts:
+                last_id = script_id
+                row = codec.encode(resume_text)
+                stats["scripts"] += 1
+                stats["resume_bytes"] += row["size"]
+                if row["hash"] not in seen:
+                    seen.add(row["hash"])
+                    stats["distinct_resumes"] += 1
+                    stats["distinct_bytes"] += row["size"]
+                    if blobs_exist and db.scalar(select(Blob.hash).where(Blob.hash == row["hash"])) is not None:
+                        stats["already_stored"] += 1
+                    else:
+                        stats["stored_bytes"] += len(row["data"])
+                        if not dry_run:
+                            db.execute(blob_insert(dialect_name, row))
+                if not dry_run:
+                    db.execute(
+                        update(Script).where(Script.id == script_id).values(resume_blob_hash=row["hash"], resume_text=None)
+                    )
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+    return stats
+
+def _size(size: int) -> str:
+    return f"{size} B" if size < 1024 else f"{size / 1024:.1f} KB"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="scripts migrated per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report the storage reduction without writing anything")
+    parser.add_argument("--vacuum", action="store_true", help="on SQLite, rebuild the file afterwards to release freed pages")
+    args = parser.parse_args()
+
+    codec = BlobCodec(settings.BLOB_COMPRESSION, settings.BLOB_COMPRESSION_LEVEL)
+    file_size_before = database_file_size()
+
+    if args.dry_run:
+        print("Dry run: no changes will be written")
+    else:
+        with engine.begin() as conn:
+            Base.metadata.tables["blobs"].create(conn, checkfirst=True)
+            if add_blob_column(conn):
+                print("✅ Added scripts.resume_blob_hash")
+        print("✅ blobs table is in place")
+
+    stats = migrate(codec, args.batch_size, args.dry_run)
+
+    saved_by_dedup = stats["resume_bytes"] - stats["distinct_bytes"]
+    after = stats["stored_bytes"]
+    print(f"\nScripts {'to migrate' if args.dry_run else 'migrated'}: {stats['scripts']} "
+          f"({stats['distinct_resumes']} distinct resumes, {stats['already_stored']} already stored as blobs)")
+    print(f"Codec: {codec.codec}")
+    print(f"Resume text before:       {_size(stats['resume_bytes'])}")
+    print(f"After deduplication:      {_size(stats['distinct_bytes'])} (-{_size(saved_by_dedup)})")
+    print(f"After compression:        {_size(after)} stored in new blobs")
+    if stats["resume_bytes"]:
+        print(f"Storage reduction:        {1 - after / stats['resume_bytes']:.1%}")
+
+    if args.vacuum and not args.dry_run and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    if file_size_before:
+        print(f"Database file: {_size(file_size_before)} -> {_size(database_file_size())}"
+              + ("" if args.vacuum or args.dry_run else " (run with --vacuum to release freed pages)"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Move saved scripts' questions from the scripts.questions_json column into
+the script_questions, script_follow_ups and script_nested_questions tables.
+
+The script:
+  1. makes scripts.questions_json nullable (SQLite rebuilds the table,
+     Postgres alters the column),
+  2. creates the question tables and their indexes,
+  3. copies each script's questions into them in batches and clears its
+     questions_json.
+
+Scripts whose questions do not have the generated shape stay as JSON and
+are listed in the report. Running it again only picks up scripts that
+still have questions_json. Back up the database first.
+
+Usage (from the project root, with the backend's DATABASE_URL):
+    python scripts/migrate_normalize_questions.py [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+from sqlalchemy import inspect, select, text, update
+
+from app.db.session import Base, SessionLocal, engine
+from app.models.models import Script
+from app.services.script_store import flatten_questions, question_inserts
+
+def relax_questions_json(conn) -> bool:
+    """Drop NOT NULL from scripts.questions_json; returns False if there was nothing to do."""
+    inspector = inspect(conn)
+    if "scripts" not in inspector.get_table_names():
+        return False
+    columns = {column["name"]: column for column in inspector.get_columns("scripts")}
+    if columns["questions_json"]["nullable"]:
+        return False
+
+    if conn.dialect.name != "sqlite":
+        conn.execute(text("ALTER TABLE scripts ALTER COLUMN questions_json DROP NOT NULL"))
+        return True
+
+    # SQLite cannot change a column's constraints, so the table is rebuilt.
+    # This runs before the question tables exist, so no foreign key follows the rename.
+    for index in inspector.get_indexes("scripts"):
+        conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+    conn.execute(text("ALTER TABLE scripts RENAME TO scripts_before_normalize"))
+    Script.__table__.create(conn)
+    copied = ", ".join(column.name for column in Script.__table__.columns if column.name in columns)
+    conn.execute(text(f"INSERT INTO scripts ({copied}) SELECT {copied} FROM scripts_before_normalize"))
+    conn.execute(text("DROP TABLE scripts_before_normalize"))
+    return True
+
+def backfill(batch_size: int, dry_run: bool) -> dict:
+    """Copy questions_json into the question tables, batch_size scripts per transaction."""
+    stats = {
+        "migrated_scripts": 0,
+        "question_rows": 0,
+        "follow_up_rows": 0,
+        "nested_rows": 0,
+        "json_bytes_cleared": 0,
+        "kept_as_json": [],
+        "invalid_json": [],
+    }
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            # Only the columns this migration needs, so it runs on any later schema as well
+            scripts = db.execute(
+                select(Script.id, Script.questions_json)
+                .where(Script.questions_json.is_not(None), Script.id > last_id)
+                .order_by(Script.id)
+                .limit(batch_size)
+            ).all()
+            if not scripts:
+                break
+            for script_id, questions_json in scripts:
+                last_id = script_id
+                try:
+                    rows = flatten_questions(json.loads(questions_json))
+                except json.JSONDecodeError:
+                    stats["invalid_json"].append(script_id)
+                    continue
+                except ValueError as e:
+                    stats["kept_as_json"].append((script_id, str(e)))
+                    continue
+                for statement, params in question_inserts(script_id, rows):
+                    db.execute(statement, params)
+                db.execute(update(Script).where(Script.id == script_id).values(questions_json=None))
+                stats["migrated_scripts"] += 1
+                stats["question_rows"] += len(rows.questions)
+                stats["follow_up_rows"] += len(rows.follow_ups)
+                stats["nested_rows"] += len(rows.nested)
+                stats["json_bytes_cleared"] += len(questions_json.encode("utf-8"))
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="scripts copied per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be copied without writing it")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print("Dry run: no changes will be written")
+    else:
+        with engine.begin() as conn:
+            if relax_questions_json(conn):
+                print("✅ scripts.questions_json is now nullable")
+            Base.metadata.create_all(bind=conn)
+        print("✅ Question tables are in place")
+
+    if args.dry_run and "script_questions" not in inspect(engine).get_table_names():
+        print("Question tables do not exist yet; run without --dry-run to create them")
+        return
+
+    stats = backfill(args.batch_size, args.dry_run)
+    print(f"Scripts migrated: {stats['migrated_scripts']}")
+    print(f"Rows written: {stats['question_rows']} questions, {stats['follow_up_rows']} follow-ups, "
+          f"{stats['nested_rows']} nested questions")
+    print(f"questions_json cleared: {stats['json_bytes_cleared'] / 1024:.1f} KB")
+    if stats["kept_as_json"]:
+        print(f"Kept as JSON ({len(stats['kept_as_json'])}):")
+        for script_id, reason in stats["kept_as_json"]:
+            print(f"  - script {script_id}: {reason}")
+    if stats["invalid_json"]:
+        print(f"⚠️  Scripts with invalid questions_json, left unchanged: {stats['invalid_json']}")
+
+if __name__ == "__main__":
+    main()